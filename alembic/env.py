@@ -1,5 +1,5 @@
 from logging.config import fileConfig
-from src.database import Base, database_url
+from src.database import Base, get_settings
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
@@ -11,7 +11,7 @@ from src.pomodoro.models import *
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option('sqlalchemy.url', database_url)
+config.set_main_option('sqlalchemy.url', get_settings().DATABASE_URL)
 
 
 
@@ -0,0 +1,34 @@
+"""history_batch
+
+Revision ID: d85c7c55f474
+Revises: ee8db6a1c866
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd85c7c55f474'
+down_revision = 'ee8db6a1c866'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index(op.f('ix_history_of_pomodoro_pomodoro_id'), table_name='history_of_pomodoro')
+    op.create_index(op.f('ix_history_of_pomodoro_pomodoro_id'), 'history_of_pomodoro', ['pomodoro_id'], unique=False)
+    op.alter_column('history_of_pomodoro', 'utc_end',
+                    existing_type=sa.DateTime(),
+                    existing_nullable=False,
+                    server_default=sa.text("timezone('utc', now())"))
+
+
+def downgrade() -> None:
+    op.alter_column('history_of_pomodoro', 'utc_end',
+                    existing_type=sa.DateTime(),
+                    existing_nullable=False,
+                    server_default=None)
+    op.drop_index(op.f('ix_history_of_pomodoro_pomodoro_id'), table_name='history_of_pomodoro')
+    op.create_index(op.f('ix_history_of_pomodoro_pomodoro_id'), 'history_of_pomodoro', ['pomodoro_id'], unique=True)
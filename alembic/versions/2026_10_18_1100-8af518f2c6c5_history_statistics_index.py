@@ -0,0 +1,26 @@
+"""history_statistics_index
+
+Revision ID: 8af518f2c6c5
+Revises: d85c7c55f474
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8af518f2c6c5'
+down_revision = 'd85c7c55f474'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_history_of_pomodoro_pomodoro_id_utc_end', 'history_of_pomodoro',
+                    ['pomodoro_id', 'utc_end'], unique=False,
+                    postgresql_include=['duration_in_seconds'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_history_of_pomodoro_pomodoro_id_utc_end', table_name='history_of_pomodoro')
@@ -0,0 +1,32 @@
+"""history_daily_rollup
+
+Revision ID: 5836c42e5ad8
+Revises: 8af518f2c6c5
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5836c42e5ad8'
+down_revision = '8af518f2c6c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # fill it from existing history with `python -m src.pomodoro.backfill`
+    op.create_table('history_daily_rollup',
+    sa.Column('pomodoro_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('focus_seconds', sa.BigInteger(), nullable=False),
+    sa.Column('intervals', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['pomodoro_id'], ['pomodoro.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('pomodoro_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('history_daily_rollup')
@@ -0,0 +1,31 @@
+"""history_keyset_index
+
+Revision ID: 1c4caa7b6aaf
+Revises: 5836c42e5ad8
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c4caa7b6aaf'
+down_revision = '5836c42e5ad8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # id breaks ties between equal utc_end values for keyset pagination
+    op.create_index('ix_history_of_pomodoro_pomodoro_id_utc_end_id', 'history_of_pomodoro',
+                    ['pomodoro_id', 'utc_end', 'id'], unique=False,
+                    postgresql_include=['duration_in_seconds'])
+    op.drop_index('ix_history_of_pomodoro_pomodoro_id_utc_end', table_name='history_of_pomodoro')
+
+
+def downgrade() -> None:
+    op.create_index('ix_history_of_pomodoro_pomodoro_id_utc_end', 'history_of_pomodoro',
+                    ['pomodoro_id', 'utc_end'], unique=False,
+                    postgresql_include=['duration_in_seconds'])
+    op.drop_index('ix_history_of_pomodoro_pomodoro_id_utc_end_id', table_name='history_of_pomodoro')
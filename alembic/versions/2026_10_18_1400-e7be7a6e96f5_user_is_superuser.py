@@ -0,0 +1,24 @@
+"""user_is_superuser
+
+Revision ID: e7be7a6e96f5
+Revises: 1c4caa7b6aaf
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7be7a6e96f5'
+down_revision = '1c4caa7b6aaf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('is_superuser', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'is_superuser')
@@ -0,0 +1,35 @@
+"""login_throttle
+
+Revision ID: 3f2b9c71d4a8
+Revises: e7be7a6e96f5
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2b9c71d4a8'
+down_revision = 'e7be7a6e96f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # throttle state is disposable, skip the WAL for it
+    prefixes = ['UNLOGGED'] if op.get_bind().dialect.name == 'postgresql' else []
+    op.create_table('login_throttle',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.Column('expires_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    prefixes=prefixes
+    )
+    op.create_index(op.f('ix_login_throttle_expires_at'), 'login_throttle', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_login_throttle_expires_at'), table_name='login_throttle')
+    op.drop_table('login_throttle')
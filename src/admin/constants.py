@@ -0,0 +1 @@
+EXPORT_BATCH_SIZE = 1000
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from ..auth.dependencies import get_current_superuser
+from ..database import get_pool_statistics
+from .schemas import ExportSchemas
+from .utils import iter_history_export, EXPORT_MEDIA_TYPES
+admin_router = APIRouter(prefix='/admin', tags=['ADMIN'],
+                         dependencies=[Depends(get_current_superuser)])
+
+
+@admin_router.get('/export/history')
+def export_history(export_format: ExportSchemas.Format = ExportSchemas.Format.ndjson):
+    return StreamingResponse(
+        iter_history_export(export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="history.{export_format.value}"'},
+    )
+
+
+@admin_router.get('/database/pool')
+def database_pool_statistics() -> dict[str, dict]:
+    return get_pool_statistics()
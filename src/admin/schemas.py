@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ExportSchemas:
+    class Format(str, Enum):
+        ndjson = 'ndjson'
+        csv = 'csv'
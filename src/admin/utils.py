@@ -0,0 +1,58 @@
+import csv
+from io import StringIO
+from typing import Iterator
+import orjson
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from ..database import SessionLocal
+from ..auth.models import User
+from ..pomodoro.models import Pomodoro, PomodoroHistory
+from .constants import EXPORT_BATCH_SIZE
+from .schemas import ExportSchemas
+
+EXPORT_MEDIA_TYPES = {
+    ExportSchemas.Format.ndjson: 'application/x-ndjson',
+    ExportSchemas.Format.csv: 'text/csv',
+}
+
+history_export_statement = (
+    select(User.id.label('user_id'),
+           User.username,
+           User.email,
+           PomodoroHistory.id.label('history_id'),
+           PomodoroHistory.utc_end,
+           PomodoroHistory.duration_in_seconds)
+    .join(Pomodoro, Pomodoro.user_id == User.id)
+    .join(PomodoroHistory, PomodoroHistory.pomodoro_id == Pomodoro.id)
+    .order_by(PomodoroHistory.id)
+)
+
+
+def iter_history_export(export_format: ExportSchemas.Format) -> Iterator[bytes]:
+    """Yields the whole history joined with users, one chunk per batch.
+
+    Rows come from a server side cursor `EXPORT_BATCH_SIZE` at a time, so
+    memory stays flat however large the history is.
+    """
+    with SessionLocal() as session:
+        result = session.execute(
+            history_export_statement,
+            execution_options={'yield_per': EXPORT_BATCH_SIZE},
+        )
+        if export_format == ExportSchemas.Format.csv:
+            yield _rows_to_csv([tuple(result.keys())])
+            for partition in result.partitions():
+                yield _rows_to_csv(partition)
+        else:
+            for partition in result.partitions():
+                yield _rows_to_ndjson(partition)
+
+
+def _rows_to_ndjson(rows: list[Row]) -> bytes:
+    return b''.join(orjson.dumps(row._asdict()) + b'\n' for row in rows)
+
+
+def _rows_to_csv(rows: list[tuple]) -> bytes:
+    buffer = StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
@@ -1,17 +1,85 @@
-from pydantic import BaseSettings
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from pydantic import BaseModel, BaseSettings, root_validator, validator
 from fastapi.security import OAuth2PasswordBearer
+
+
+def blank_to_none(value):
+    """Lets `NAME=` in .env leave an optional setting at its default."""
+    return None if value == '' else value
+
+
+class LoginThrottleBackend(str, Enum):
+    memory = 'memory'
+    database = 'database'
+    disabled = 'disabled'
+
+
+class JWTKeySettings(BaseModel):
+    """A key of the JWT key ring: an HMAC secret, a PEM private key, or
+    a PEM public key for verification only. Given inline or as a file."""
+    kid: str
+    algorithm: str
+    key: str | None = None
+    key_file: Path | None = None
+
+    @root_validator(skip_on_failure=True)
+    def check_single_source(cls, values: dict) -> dict:
+        if (values['key'] is None) == (values['key_file'] is None):
+            raise ValueError('exactly one of key and key_file is required')
+        return values
+
+    def read_key(self) -> str:
+        if self.key is not None:
+            return self.key
+        return self.key_file.read_text()
+
+
 class SecurityEnv(BaseSettings):
     class Config:
         env_file = '.env'
-    SECRET_JWT_KEY: str
+    # signs and verifies tokens without a kid header
+    SECRET_JWT_KEY: str | None = None
     TOKEN_LIFETIME_IN_MINTUTES: int
-    ENCRYPTING_ALGORITHM: str
+    ENCRYPTING_ALGORITHM: str = 'HS256'
+    # JSON list of JWTKeySettings
+    JWT_KEYS: list[JWTKeySettings] = []
+    # kid of the key new tokens are signed with,
+    # without it only SECRET_JWT_KEY signs and replicas with JWT_KEYS only verify
+    JWT_SIGNING_KID: str | None = None
     HASHING_SCHEME: str
     PEPER_SECRET: str
+    HASHING_WORKERS: int | None = None
+    HASHING_QUEUE_SIZE: int = 64
+    PRINCIPAL_CACHE_SIZE: int = 4096
+    PRINCIPAL_CACHE_TTL_IN_SECONDS: int = 30
+    LOGIN_THROTTLE_BACKEND: LoginThrottleBackend = LoginThrottleBackend.memory
+    LOGIN_THROTTLE_MAX_KEYS: int = 100_000
+    LOGIN_USERNAME_BURST: int = 5
+    LOGIN_USERNAME_ATTEMPTS_PER_MINUTE: float = 5
+    LOGIN_ADDRESS_BURST: int = 20
+    LOGIN_ADDRESS_ATTEMPTS_PER_MINUTE: float = 60
+
+    _blank_hashing_workers = validator(
+        'HASHING_WORKERS', pre=True, allow_reuse=True)(blank_to_none)
 
 TOKEN_TYPE = 'Bearer'
+MAX_USER_BATCH_SIZE = 10_000
+# marks hashes made from an HMAC peppered secret, others are legacy double bcrypt
+HMAC_PEPPER_PREFIX = '$hmac-sha256'
+
+
+
+@lru_cache
+def get_security_env() -> SecurityEnv:
+    return SecurityEnv()
+
 
-security_env = SecurityEnv()
+def __getattr__(name: str):
+    if name == 'security_env':
+        return get_security_env()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='authorization')
\ No newline at end of file
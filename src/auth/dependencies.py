@@ -1,33 +1,45 @@
-from typing import Annotated
-from .constants import security_env, oauth2_scheme
-from ..database import SessionLocal
-from .utils import UserDBCRUD
+from .constants import oauth2_scheme
+from ..database import AsyncSessionLocal
+from .utils import UserAsyncDBCRUD, get_principal_cache
+from .tokens import get_jwt_key_ring
 from .schemas import UserSchemas
+from .exceptions import HTTPException403
+from ..monitoring.metrics import jwt_duration_seconds
 from fastapi import Depends, status, HTTPException
-from jose import jwt, JWTError
+from jose import JWTError
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> UserSchemas.Get:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserSchemas.Get:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token,
-                             security_env.SECRET_JWT_KEY,
-                             algorithms=[security_env.ENCRYPTING_ALGORITHM])
+        with jwt_duration_seconds.time(operation='decode'):
+            payload = get_jwt_key_ring().decode(token)
         username: str = payload.get('sub')
         if username is None:
             raise credentials_exception
     except JWTError as exc:
         raise credentials_exception from exc
-    with SessionLocal() as session:
-        crud = UserDBCRUD(session)
-        current_user = crud.get_user_by_username(username)
+    principal_cache = get_principal_cache()
+    current_user = principal_cache.get(username)
+    if current_user is not None:
+        return current_user
+    async with AsyncSessionLocal() as session:
+        crud = UserAsyncDBCRUD(session)
+        current_user = await crud.get_user_by_username(username)
+    principal_cache.set(username, current_user)
     return current_user
 
 
 async def get_current_user_if_active(user: UserSchemas.Get = Depends(get_current_user)) -> UserSchemas.Get:
     if user.is_active:
         return user
-    raise HTTPException(status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+    raise HTTPException(status.HTTP_401_UNAUTHORIZED)
+
+
+async def get_current_superuser(user: UserSchemas.Get = Depends(get_current_user_if_active)) -> UserSchemas.Get:
+    if user.is_superuser:
+        return user
+    raise HTTPException403
@@ -7,5 +7,18 @@ HTTPException400 = HTTPException(
 HTTPException401 = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED, detail="Inputed values isn't correct")
 
+HTTPException403 = HTTPException(
+    status_code=status.HTTP_403_FORBIDDEN, detail='Not enough permissions')
+
 HTTPException409 = HTTPException(
     status_code=status.HTTP_409_CONFLICT, detail='Already exists')
+
+
+def get_http_exception_429(retry_after_in_seconds: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail='Too many login attempts',
+        headers={'Retry-After': str(retry_after_in_seconds)})
+
+HTTPException503 = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='Server is busy, try again later')
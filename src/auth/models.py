@@ -1,4 +1,4 @@
-from sqlalchemy import (Boolean, Column, Integer, String)
+from sqlalchemy import (Boolean, Column, Float, Integer, String, false)
 
 from ..database import Base
 
@@ -11,3 +11,15 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
+    is_superuser = Column(Boolean, nullable=False, default=False, server_default=false())
+
+
+class LoginAttemptBucket(Base):
+    """Token bucket of the shared login throttle, times are unix timestamps.
+    The table is UNLOGGED in postgres, losing it on crash only resets limits."""
+    __tablename__ = 'login_throttle'
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False, index=True)
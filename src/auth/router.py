@@ -1,43 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from .service import Authenticator
+from .service import AsyncAuthenticator, AuthenticationToken
 from .exceptions import HTTPException401
-from ..database import SessionLocal
+from ..database import AsyncSessionLocal
 from .schemas import UserSchemas
-from .utils import UserDBCRUD
-from .dependencies import get_current_user_if_active
+from .utils import UserAsyncDBCRUD
+from .dependencies import get_current_user_if_active, get_current_superuser
+from .throttling import get_login_throttle
+from ..responses import ModelResponse
 auth_router = APIRouter(prefix='/authorization', tags=['AUTHORIZATION'])
 
 
-@auth_router.post('')
-def authenticate(form_data: OAuth2PasswordRequestForm = Depends()):
-    with SessionLocal() as session:
-        crud = UserDBCRUD(session)
-        authenticator = Authenticator(crud)
+@auth_router.post('', response_model=AuthenticationToken)
+async def authenticate(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    client_address = request.client.host if request.client else None
+    await get_login_throttle().check(form_data.username, client_address)
+    async with AsyncSessionLocal() as session:
+        crud = UserAsyncDBCRUD(session)
+        authenticator = AsyncAuthenticator(crud)
         try:
-            token = authenticator.get_auth_token_or_none(
+            token = await authenticator.get_auth_token_or_none(
                 form_data.username, form_data.password)
         except HTTPException as exc:
+            # a saturated hashing pool isn't a credentials problem
+            if exc.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                raise
             raise HTTPException401 from exc
+        await session.commit()
     if not token:
         raise HTTPException401
-    return token
+    return ModelResponse(token)
 
 
-@auth_router.post('/update_password')
-def update_password(password_form: UserSchemas.FormPasswordChange,
-                   user: UserSchemas.Get = Depends(get_current_user_if_active)):
-    with SessionLocal() as session:
-        crud = UserDBCRUD(session)
-        authenticator = Authenticator(crud)
-        authenticator.change_user_password(password_form, user)
-        session.commit()
-    return user
+@auth_router.post('/update_password', response_model=UserSchemas.Get)
+async def update_password(password_form: UserSchemas.FormPasswordChange,
+                          user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    async with AsyncSessionLocal() as session:
+        crud = UserAsyncDBCRUD(session)
+        authenticator = AsyncAuthenticator(crud)
+        await authenticator.change_user_password(password_form, user)
+        await session.commit()
+    return ModelResponse(user)
 
-@auth_router.post('/user')
-def create_user(new_user: UserSchemas.Create):
-    with SessionLocal() as session:
-        crud = UserDBCRUD(session)
-        crud.create_user(new_user)
-        session.commit()
-    return new_user
+@auth_router.post('/user', response_model=UserSchemas.Get)
+async def create_user(new_user: UserSchemas.Create):
+    async with AsyncSessionLocal() as session:
+        crud = UserAsyncDBCRUD(session)
+        created_user = await crud.create_user(new_user)
+        await session.commit()
+    return ModelResponse(created_user)
+
+
+@auth_router.post('/users', response_model=UserSchemas.CreateBatchResult,
+                  dependencies=[Depends(get_current_superuser)])
+async def create_users(batch: UserSchemas.CreateBatch):
+    async with AsyncSessionLocal() as session:
+        crud = UserAsyncDBCRUD(session)
+        result = await crud.create_users(batch.users)
+        await session.commit()
+    return ModelResponse(result)
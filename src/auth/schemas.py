@@ -1,4 +1,6 @@
+from typing import NamedTuple
 from pydantic import BaseModel, Field
+from .constants import MAX_USER_BATCH_SIZE
 
 
 password_field = Field(max_length=40, min_length=6, default=None)
@@ -6,18 +8,47 @@ username_field = Field(
     regex=r"(?![_.])(?!.*[_.]{2})[a-zA-Z0-9._]+(?<![_.])$", max_length=20, min_length=5)
 
 
+class UserCredentials(NamedTuple):
+    id: int
+    hashed_password: str
+    is_active: bool
+
+
+class UserGet(BaseModel):
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    is_superuser: bool = False
+
+
+class UserCreate(BaseModel):
+    username: str = username_field
+    email: str
+    is_active: bool = True
+    password: str = password_field
+
+
+class UserConflict(BaseModel):
+    # position in the request
+    index: int
+    username: str
+    # fields taken by an existing user or by an earlier user of the request
+    fields: list[str]
+
+
 class UserSchemas:
-    class Get(BaseModel):
-        id: int
-        username: str
-        email: str
-        is_active: bool
-
-    class Create(BaseModel):
-        username: str = username_field
-        email: str
-        is_active: bool = True
-        password: str = password_field
+    Credentials = UserCredentials
+    Get = UserGet
+    Create = UserCreate
+    Conflict = UserConflict
+
+    class CreateBatch(BaseModel):
+        users: list[UserCreate] = Field(min_items=1, max_items=MAX_USER_BATCH_SIZE)
+
+    class CreateBatchResult(BaseModel):
+        created: list[UserGet]
+        conflicts: list[UserConflict]
 
     class Update(BaseModel):
         id: int
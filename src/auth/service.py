@@ -1,5 +1,5 @@
 from .constants import TOKEN_TYPE
-from .utils import UserCrud, secret_manager
+from .utils import UserCrud, AsyncUserCrud, get_secret_manager
 from .schemas import UserSchemas
 from .exceptions import HTTPException400, HTTPException401
 from pydantic import BaseModel
@@ -22,23 +22,67 @@ class Authenticator:
             raise HTTPException400
         current_hashed_password = self.crud.get_user_hashed_password_from_username(
             current_user.username)
-        if not secret_manager.is_secret_correct(current_hashed_password, update_user.old_password):
+        if not get_secret_manager().is_secret_correct(current_hashed_password, update_user.old_password):
             raise HTTPException401
-        current_user_dict = current_user.dict()
-        current_user_dict['password'] = update_user.new_password
-        user_to_save = UserSchemas.Update(**current_user_dict)
+        user_to_save = UserSchemas.Update(id=current_user.id,
+                                          username=current_user.username,
+                                          password=update_user.new_password)
         self.crud.save_user(user_to_save)
         
     def get_auth_token_or_none(self, username: str, password: str) -> AuthenticationToken:
-        hashed_password_of_user = self.crud.get_user_hashed_password_from_username(
-            username)
-        if not hashed_password_of_user:
+        credentials = self.crud.get_user_credentials(username)
+        # rejected before hashing, inactive users can't log in anyway
+        if not credentials.hashed_password or not credentials.is_active:
             raise HTTPException401
 
-        if not secret_manager.is_secret_correct(hashed_password_of_user, password):
+        is_correct, new_hashed_password = get_secret_manager().verify_and_update(
+            credentials.hashed_password, password)
+        if not is_correct:
             raise HTTPException401
+        if new_hashed_password is not None:
+            self.crud.update_user_hashed_password(username, new_hashed_password)
 
-        auth_token = secret_manager.generate_jwt_token({'sub': username})
+        auth_token = get_secret_manager().generate_jwt_token({'sub': username})
+        return_token = AuthenticationToken(
+            access_token=auth_token, token_type=TOKEN_TYPE)
+        return return_token
+
+
+class AsyncAuthenticator:
+
+    def __init__(self, crud: AsyncUserCrud) -> None:
+        self.crud = crud
+
+    async def change_user_password(self,
+                                   update_user: UserSchemas.FormPasswordChange,
+                                   current_user: UserSchemas.Get) -> None:
+        if update_user.new_password == update_user.old_password:
+            raise HTTPException400
+        current_hashed_password = await self.crud.get_user_hashed_password_from_username(
+            current_user.username)
+        is_correct = await get_secret_manager().is_secret_correct_async(
+            current_hashed_password, update_user.old_password)
+        if not is_correct:
+            raise HTTPException401
+        user_to_save = UserSchemas.Update(id=current_user.id,
+                                          username=current_user.username,
+                                          password=update_user.new_password)
+        await self.crud.save_user(user_to_save)
+
+    async def get_auth_token_or_none(self, username: str, password: str) -> AuthenticationToken:
+        credentials = await self.crud.get_user_credentials(username)
+        # rejected before hashing, inactive users can't log in anyway
+        if not credentials.hashed_password or not credentials.is_active:
+            raise HTTPException401
+
+        is_correct, new_hashed_password = await get_secret_manager().verify_and_update_async(
+            credentials.hashed_password, password)
+        if not is_correct:
+            raise HTTPException401
+        if new_hashed_password is not None:
+            await self.crud.update_user_hashed_password(username, new_hashed_password)
+
+        auth_token = get_secret_manager().generate_jwt_token({'sub': username})
         return_token = AuthenticationToken(
             access_token=auth_token, token_type=TOKEN_TYPE)
         return return_token
@@ -0,0 +1,196 @@
+"""Token bucket throttling of login attempts.
+
+Every key (a username or a client address) owns a bucket holding up to `burst`
+tokens, refilled at `rate_per_second`. An attempt takes a token; a rejected
+attempt still costs one, down to a debt of a single token, so a client
+hammering a closed bucket keeps it closed instead of getting through at the
+refill rate. A bucket that has refilled completely is equal to a missing one,
+so both backends drop it once it expires.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import sha256
+from math import ceil
+from threading import Lock
+from time import monotonic, time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import case, delete, literal
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..database import AsyncSessionLocal, get_dialect_insert
+from .constants import LoginThrottleBackend, get_security_env
+from .exceptions import get_http_exception_429
+from .models import LoginAttemptBucket
+
+# the database backend deletes expired buckets at most once per interval
+PURGE_INTERVAL_IN_SECONDS = 60
+
+
+class ThrottleRule(NamedTuple):
+    burst: int
+    rate_per_second: float
+
+    @classmethod
+    def per_minute(cls, burst: int, attempts_per_minute: float) -> 'ThrottleRule':
+        return cls(burst, attempts_per_minute / 60)
+
+
+def take_token(tokens: float, elapsed: float, rule: ThrottleRule) -> float:
+    """Returns the bucket content after an attempt, negative when it is rejected."""
+    refilled = min(rule.burst, tokens + elapsed * rule.rate_per_second)
+    return max(refilled - 1, -1.0)
+
+
+def get_retry_after(tokens: float, rule: ThrottleRule) -> float:
+    """Seconds until the bucket holds a whole token again, 0 if the attempt passed."""
+    if tokens >= 0:
+        return 0.0
+    return (1 - tokens) / rule.rate_per_second
+
+
+def get_expires_after(tokens: float, rule: ThrottleRule) -> float:
+    return (rule.burst - tokens) / rule.rate_per_second
+
+
+class ThrottleBackend(ABC):
+    @abstractmethod
+    async def take(self, key: str, rule: ThrottleRule) -> float:
+        """Takes a token from the bucket of `key`, returns seconds to wait or 0."""
+        pass
+
+
+class InMemoryThrottleBackend(ThrottleBackend):
+    """Buckets of a single process, at most `max_keys` of them. When full,
+    the least recently used bucket is forgotten."""
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at, expires_at), least recently used first
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, rule: ThrottleRule) -> float:
+        now = monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None or bucket[2] <= now:
+                tokens = take_token(rule.burst, 0, rule)
+            else:
+                tokens = take_token(bucket[0], now - bucket[1], rule)
+            self._buckets[key] = (tokens, now, now + get_expires_after(tokens, rule))
+            self._purge(now)
+        return get_retry_after(tokens, rule)
+
+    def _purge(self, now: float) -> None:
+        buckets = self._buckets
+        while len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+        while buckets:
+            _, (_, _, expires_at) = next(iter(buckets.items()))
+            if expires_at > now:
+                break
+            buckets.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class DisabledThrottleBackend(ThrottleBackend):
+    """Lets every attempt through, for deployments limiting logins upstream
+    and for load benchmarks sending all traffic from one address."""
+
+    async def take(self, key: str, rule: ThrottleRule) -> float:
+        return 0.0
+
+
+def build_take_token_upsert(dialect_name: str, key: str, rule: ThrottleRule, now: float):
+    """INSERT ... ON CONFLICT DO UPDATE applying `take_token` to the stored
+    bucket in one statement, returning the new token count."""
+    insert = get_dialect_insert(dialect_name)
+    first_tokens = take_token(rule.burst, 0, rule)
+    statement = insert(LoginAttemptBucket).values(
+        key=key, tokens=first_tokens, updated_at=now,
+        expires_at=now + get_expires_after(first_tokens, rule))
+
+    stored = LoginAttemptBucket
+    refilled = stored.tokens + (literal(now) - stored.updated_at) * rule.rate_per_second
+    refilled = case((refilled > rule.burst, float(rule.burst)), else_=refilled)
+    tokens = case((refilled < 0, -1.0), else_=refilled - 1)
+    return statement.on_conflict_do_update(
+        index_elements=[stored.key],
+        set_={
+            'tokens': tokens,
+            'updated_at': now,
+            'expires_at': literal(now) + (rule.burst - tokens) / rule.rate_per_second,
+        },
+    ).returning(stored.tokens)
+
+
+class DatabaseThrottleBackend(ThrottleBackend):
+    """Buckets in the `login_throttle` table, shared by all workers.
+    Every attempt is a single atomic upsert."""
+
+    def __init__(self, session_maker: async_sessionmaker = AsyncSessionLocal) -> None:
+        self.session_maker = session_maker
+        self._purged_at = float('-inf')
+
+    async def take(self, key: str, rule: ThrottleRule) -> float:
+        now = time()
+        async with self.session_maker() as session:
+            statement = build_take_token_upsert(session.bind.dialect.name, key, rule, now)
+            tokens = await session.scalar(statement)
+            if now - self._purged_at >= PURGE_INTERVAL_IN_SECONDS:
+                self._purged_at = now
+                await session.execute(
+                    delete(LoginAttemptBucket).where(LoginAttemptBucket.expires_at <= now))
+            await session.commit()
+        return get_retry_after(tokens, rule)
+
+
+def get_username_key(username: str) -> str:
+    """Hashed, so arbitrarily long usernames can't inflate the memory
+    backend or the primary keys of the login_throttle table."""
+    return 'username:' + sha256(username.lower().encode()).hexdigest()
+
+
+class LoginThrottle:
+    def __init__(self, backend: ThrottleBackend,
+                 username_rule: ThrottleRule, address_rule: ThrottleRule) -> None:
+        self.backend = backend
+        self.username_rule = username_rule
+        self.address_rule = address_rule
+
+    async def check(self, username: str, client_address: Optional[str]) -> None:
+        """Takes a token for the client address, then for the username.
+        Raises 429 with Retry-After if either bucket is empty."""
+        if client_address is not None:
+            retry_after = await self.backend.take(f'address:{client_address}', self.address_rule)
+            if retry_after:
+                raise get_http_exception_429(ceil(retry_after))
+        retry_after = await self.backend.take(get_username_key(username), self.username_rule)
+        if retry_after:
+            raise get_http_exception_429(ceil(retry_after))
+
+
+@lru_cache
+def get_login_throttle() -> LoginThrottle:
+    security_env = get_security_env()
+    if security_env.LOGIN_THROTTLE_BACKEND == LoginThrottleBackend.database:
+        backend = DatabaseThrottleBackend()
+    elif security_env.LOGIN_THROTTLE_BACKEND == LoginThrottleBackend.disabled:
+        backend = DisabledThrottleBackend()
+    else:
+        backend = InMemoryThrottleBackend(security_env.LOGIN_THROTTLE_MAX_KEYS)
+    return LoginThrottle(
+        backend,
+        username_rule=ThrottleRule.per_minute(security_env.LOGIN_USERNAME_BURST,
+                                              security_env.LOGIN_USERNAME_ATTEMPTS_PER_MINUTE),
+        address_rule=ThrottleRule.per_minute(security_env.LOGIN_ADDRESS_BURST,
+                                             security_env.LOGIN_ADDRESS_ATTEMPTS_PER_MINUTE),
+    )
@@ -0,0 +1,84 @@
+"""JWT key ring.
+
+Keys are parsed into jose key objects once, so encoding and decoding skip the
+per-call key construction. Tokens carry the `kid` of their signing key and are
+verified by that key only, with the algorithm it was configured for. During a
+rotation the old key stays in the ring for verification while the new one signs.
+Replicas given only public keys verify tokens without holding signing material.
+"""
+from functools import lru_cache
+from typing import Iterable, NamedTuple
+
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
+from jose.constants import ALGORITHMS
+
+from .constants import SecurityEnv, get_security_env
+
+
+class JWTKey(NamedTuple):
+    # None for the legacy key, which signs tokens without a kid header
+    kid: str | None
+    algorithm: str
+    # None for public keys
+    signing_key: Key | None
+    verifying_key: Key
+
+
+def parse_jwt_key(kid: str | None, algorithm: str, key: str) -> JWTKey:
+    if algorithm not in ALGORITHMS.SUPPORTED:
+        raise ValueError(f'JWT algorithm {algorithm!r} of key {kid!r} is not supported')
+    parsed_key = jwk.construct(key, algorithm)
+    if algorithm in ALGORITHMS.HMAC:
+        return JWTKey(kid, algorithm, parsed_key, parsed_key)
+    if parsed_key.is_public():
+        return JWTKey(kid, algorithm, None, parsed_key)
+    return JWTKey(kid, algorithm, parsed_key, parsed_key.public_key())
+
+
+class JWTKeyRing:
+    def __init__(self, keys: Iterable[JWTKey], signing_kid: str | None = None,
+                 is_signing: bool = True) -> None:
+        self.keys = {key.kid: key for key in keys}
+        self.signing_key: JWTKey | None = None
+        if is_signing:
+            if signing_kid not in self.keys:
+                raise ValueError(f'signing JWT key {signing_kid!r} is not in the key ring')
+            self.signing_key = self.keys[signing_kid]
+            if self.signing_key.signing_key is None:
+                raise ValueError(f'JWT key {signing_kid!r} is a public key and cannot sign')
+
+    def encode(self, claims: dict) -> str:
+        if self.signing_key is None:
+            raise RuntimeError('the JWT key ring has no signing key')
+        kid, algorithm, signing_key, _ = self.signing_key
+        headers = {'kid': kid} if kid is not None else None
+        return jwt.encode(claims, signing_key, algorithm=algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        """Verifies the token with the key named by its kid header, raises JWTError."""
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is not None and not isinstance(kid, str):
+            raise JWTError('Invalid kid header')
+        jwt_key = self.keys.get(kid)
+        if jwt_key is None:
+            raise JWTError(f'Unknown key {kid!r}')
+        return jwt.decode(token, jwt_key.verifying_key, algorithms=[jwt_key.algorithm])
+
+
+def build_jwt_key_ring(security_env: SecurityEnv) -> JWTKeyRing:
+    keys = [parse_jwt_key(key_settings.kid, key_settings.algorithm, key_settings.read_key())
+            for key_settings in security_env.JWT_KEYS]
+    if security_env.SECRET_JWT_KEY is not None:
+        keys.append(parse_jwt_key(None, security_env.ENCRYPTING_ALGORITHM,
+                                  security_env.SECRET_JWT_KEY))
+    if not keys:
+        raise ValueError('either SECRET_JWT_KEY or JWT_KEYS is required')
+    signing_kid = security_env.JWT_SIGNING_KID
+    is_signing = signing_kid is not None or security_env.SECRET_JWT_KEY is not None
+    return JWTKeyRing(keys, signing_kid, is_signing)
+
+
+@lru_cache
+def get_jwt_key_ring() -> JWTKeyRing:
+    return build_jwt_key_ring(get_security_env())
@@ -1,49 +1,322 @@
+import asyncio
+import hashlib
+import hmac
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+from threading import Lock
+from typing import Any, Callable
 from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update, event
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.hash import bcrypt
 from passlib.context import CryptContext
-from . import models
 from .schemas import UserSchemas
 from .models import User
-from .constants import security_env
-from .exceptions import HTTPException400, HTTPException409
-from jose import jwt
+from .constants import get_security_env, HMAC_PEPPER_PREFIX
+from .exceptions import HTTPException400, HTTPException409, HTTPException503
+from .tokens import get_jwt_key_ring
+from ..cache import TTLCache
+from ..database import get_dialect_insert
+from ..monitoring.metrics import (
+    timed,
+    timed_methods,
+    password_hashing_duration_seconds,
+    jwt_duration_seconds,
+    db_crud_duration_seconds,
+)
 from sqlalchemy.exc import IntegrityError
 
+# passwords hashed by one process pool call in bulk hashing
+HASHING_CHUNK_SIZE = 16
+
+class _HashingExecutor:
+    """Process pool reserved for password hashing.
+
+    At most `max_workers + queue_size` calls of `run` may be in flight, the
+    rest are rejected with 503 instead of piling up behind the pool. Bulk
+    calls of `run_bulk` wait for one of `bulk_slots` instead, so they occupy
+    at most that many workers and interactive calls keep the others.
+    """
+
+    def __init__(self, max_workers: int | None, queue_size: int,
+                 bulk_slots: int | None = None) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.bulk_slots = bulk_slots or max(1, self.max_workers // 2)
+        self._pool: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+        self._lock = Lock()
+        # an asyncio semaphore is bound to the loop it is first used in
+        self._bulk_semaphore: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.queue_size:
+                raise HTTPException503
+            self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), func, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    async def run_bulk(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._bulk_semaphore is None or self._bulk_semaphore[0] is not loop:
+            self._bulk_semaphore = (loop, asyncio.Semaphore(self.bulk_slots))
+        async with self._bulk_semaphore[1]:
+            return await loop.run_in_executor(self._get_pool(), func, *args)
+
+    async def warm_up(self) -> None:
+        """Spawns every worker and lets it import the hashing code."""
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+        await asyncio.gather(*(loop.run_in_executor(pool, _warm_up_worker)
+                               for _ in range(self.max_workers)))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=get_context('spawn'))
+            return self._pool
+
+
 class _SecretController:
     def __init__(self) -> None:
+        self.security_env = get_security_env()
         self.pwd_context = CryptContext(
-            schemes=[security_env.HASHING_SCHEME],
+            schemes=[self.security_env.HASHING_SCHEME],
             deprecated="auto"
         )
+        self.executor = _HashingExecutor(
+            max_workers=self.security_env.HASHING_WORKERS,
+            queue_size=self.security_env.HASHING_QUEUE_SIZE,
+        )
+
+    @timed(password_hashing_duration_seconds, operation='is_secret_correct')
+    async def is_secret_correct_async(self,
+                                      hashed_secret: str | None,
+                                      secret_to_check: str) -> bool:
+        if not hashed_secret:
+            return False
+        return await self.executor.run(_is_secret_correct, hashed_secret, secret_to_check)
+
+    @timed(password_hashing_duration_seconds, operation='is_secret_correct')
+    async def verify_and_update_async(self,
+                                      hashed_secret: str | None,
+                                      secret_to_check: str) -> tuple[bool, str | None]:
+        if not hashed_secret:
+            return False, None
+        return await self.executor.run(_verify_and_update, hashed_secret, secret_to_check)
+
+    @timed(password_hashing_duration_seconds, operation='hash_secret')
+    async def hash_secret_async(self, secret: str) -> str:
+        return await self.executor.run(_hash_secret, secret)
+
+    async def hash_secrets_async(self, secrets: list[str],
+                                 chunk_size: int = HASHING_CHUNK_SIZE) -> list[str]:
+        """Hashes `secrets` in chunks on the bulk share of the pool, one
+        executor call per chunk. Remaining chunks are cancelled on a failure."""
+        tasks = [asyncio.create_task(self.executor.run_bulk(_hash_secrets,
+                                                            secrets[start:start + chunk_size]))
+                 for start in range(0, len(secrets), chunk_size)]
+        try:
+            hashed_chunks = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return [hashed_secret for chunk in hashed_chunks for hashed_secret in chunk]
 
     def is_secret_correct(self,
-                          hashed_secret: str,
+                          hashed_secret: str | None,
                           secret_to_check: str) -> bool:
-        peppered_password = self.pepper_secret_by_bcrypt(secret_to_check)
-        return self.pwd_context.verify(peppered_password, hashed_secret)
+        is_correct, _ = self.verify_and_update(hashed_secret, secret_to_check)
+        return is_correct
 
+    @timed(password_hashing_duration_seconds, operation='is_secret_correct')
+    def verify_and_update(self,
+                          hashed_secret: str | None,
+                          secret_to_check: str) -> tuple[bool, str | None]:
+        """Checks the secret and, when it is correct but `hashed_secret` is
+        outdated, returns a replacement hash as the second item.
+
+        Hashes without HMAC_PEPPER_PREFIX come from the legacy double bcrypt
+        scheme and are always replaced; current ones are replaced when
+        `pwd_context` marks them as needing an update. Users without a
+        password (NULL hash) never match.
+        """
+        if not hashed_secret:
+            return False, None
+        if not hashed_secret.startswith(HMAC_PEPPER_PREFIX):
+            legacy_peppered_secret = self.pepper_secret_by_bcrypt(secret_to_check)
+            if not self.pwd_context.verify(legacy_peppered_secret, hashed_secret):
+                return False, None
+            return True, self.hash_secret(secret_to_check)
+
+        peppered_secret = self.pepper_secret_by_hmac(secret_to_check)
+        is_correct, new_hashed_secret = self.pwd_context.verify_and_update(
+            peppered_secret, hashed_secret.removeprefix(HMAC_PEPPER_PREFIX))
+        if new_hashed_secret is not None:
+            new_hashed_secret = HMAC_PEPPER_PREFIX + new_hashed_secret
+        return is_correct, new_hashed_secret
+
+    @timed(jwt_duration_seconds, operation='encode')
     def generate_jwt_token(self, body: dict,
                            expires_delta: timedelta = timedelta(minutes=15)) -> str:
         body_to_encode = body.copy()
         expire = datetime.utcnow() + expires_delta
         body_to_encode.update({'exp': expire})
-        jwt_token = jwt.encode(body_to_encode,
-                               security_env.SECRET_JWT_KEY,
-                               algorithm=security_env.ENCRYPTING_ALGORITHM)
-        return jwt_token
+        return get_jwt_key_ring().encode(body_to_encode)
 
     def pepper_secret_by_bcrypt(self, secret: str) -> str:
-        return bcrypt.using(salt=security_env.PEPER_SECRET).hash(secret)
+        return bcrypt.using(salt=self.security_env.PEPER_SECRET).hash(secret)
+
+    def pepper_secret_by_hmac(self, secret: str) -> str:
+        return hmac.new(self.security_env.PEPER_SECRET.encode(),
+                        secret.encode(),
+                        hashlib.sha256).hexdigest()
 
+    @timed(password_hashing_duration_seconds, operation='hash_secret')
     def hash_secret(self, secret: str) -> str:
-        peppered_secret = self.pepper_secret_by_bcrypt(secret)
+        peppered_secret = self.pepper_secret_by_hmac(secret)
         hashed_secret = self.pwd_context.hash(peppered_secret)
-        return hashed_secret
+        return HMAC_PEPPER_PREFIX + hashed_secret
+
+
+@lru_cache
+def get_secret_manager() -> _SecretController:
+    return _SecretController()
+
+
+def _is_secret_correct(hashed_secret: str, secret_to_check: str) -> bool:
+    return get_secret_manager().is_secret_correct(hashed_secret, secret_to_check)
+
+
+def _verify_and_update(hashed_secret: str, secret_to_check: str) -> tuple[bool, str | None]:
+    return get_secret_manager().verify_and_update(hashed_secret, secret_to_check)
+
+
+def _hash_secret(secret: str) -> str:
+    return get_secret_manager().hash_secret(secret)
+
+
+def _hash_secrets(secrets: list[str]) -> list[str]:
+    secret_manager = get_secret_manager()
+    return [secret_manager.hash_secret(secret) for secret in secrets]
+
 
+def _warm_up_worker() -> None:
+    get_secret_manager()
 
-secret_manager = _SecretController()
+
+@lru_cache
+def get_principal_cache() -> TTLCache:
+    security_env = get_security_env()
+    return TTLCache(
+        maxsize=security_env.PRINCIPAL_CACHE_SIZE,
+        ttl_in_seconds=security_env.PRINCIPAL_CACHE_TTL_IN_SECONDS,
+    )
+
+
+_lazy_attributes = {
+    'secret_manager': get_secret_manager,
+    'principal_cache': get_principal_cache,
+}
+
+
+def __getattr__(name: str):
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def invalidate_principal_on_commit(session: Session, *usernames: str | None) -> None:
+    """Drops the cached principals now and once more when `session` commits,
+    so a concurrent request can't re-cache the pre-commit row. Only the cache
+    of this process is affected, other workers keep theirs until it expires."""
+    principal_cache = get_principal_cache()
+
+    def invalidate(_=None) -> None:
+        for username in usernames:
+            if username is not None:
+                principal_cache.invalidate(username)
+
+    invalidate()
+    event.listen(session, 'after_commit', invalidate, once=True)
+
+
+USER_COLUMNS = (User.id, User.username, User.email, User.is_active, User.is_superuser)
+CREDENTIALS_COLUMNS = (User.id, User.hashed_password, User.is_active)
+
+
+UNIQUE_USER_FIELDS = ('username', 'email')
+# keeps multi-row statements well under the 32767 parameters asyncpg allows
+USER_INSERT_BATCH_SIZE = 1000
+
+
+def find_user_conflicts(users: list[UserSchemas.Create],
+                        taken: dict[str, set[str]]) -> dict[int, UserSchemas.Conflict]:
+    """Conflicts of `users` with the `taken` unique values and with each other,
+    by position. Values of the users without conflicts are added to `taken`."""
+    conflicts = {}
+    for index, user in enumerate(users):
+        fields = [field for field in UNIQUE_USER_FIELDS if getattr(user, field) in taken[field]]
+        if fields:
+            conflicts[index] = UserSchemas.Conflict(index=index, username=user.username,
+                                                    fields=fields)
+            continue
+        for field in UNIQUE_USER_FIELDS:
+            taken[field].add(getattr(user, field))
+    return conflicts
+
+
+def build_taken_values_select(users: list[UserSchemas.Create]):
+    return select(User.username, User.email).where(or_(
+        User.username.in_([user.username for user in users]),
+        User.email.in_([user.email for user in users]),
+    ))
+
+
+def build_users_insert(dialect_name: str, users: list[UserSchemas.Create],
+                       hashed_passwords: list[str]):
+    """Multi-row INSERT skipping rows that hit a unique constraint,
+    returning the inserted ones."""
+    insert = get_dialect_insert(dialect_name)
+    return (insert(User)
+            .values([{'username': user.username,
+                      'email': user.email,
+                      'hashed_password': hashed_password,
+                      'is_active': True}
+                     for user, hashed_password in zip(users, hashed_passwords)])
+            .on_conflict_do_nothing()
+            .returning(*USER_COLUMNS))
+
+
+def build_user_update(user_to_save: UserSchemas.Update, hashed_password: str | None):
+    """UPDATE of the set fields of `user_to_save` returning the username,
+    None when there is nothing to update."""
+    values = user_to_save.dict(exclude={'id', 'password'}, exclude_none=True)
+    if hashed_password is not None:
+        values['hashed_password'] = hashed_password
+    if not values:
+        return None
+    return (update(User)
+            .where(User.id == user_to_save.id)
+            .values(**values)
+            .returning(User.username))
 
 
 class UserCrud(ABC):
@@ -56,51 +329,79 @@ class UserCrud(ABC):
     def get_user_hashed_password_from_username(self, username: str) -> UserSchemas.Get:
         pass
 
+    @abstractmethod
+    def get_user_credentials(self, username: str) -> UserSchemas.Credentials:
+        pass
+
     @abstractmethod
     def save_user(self, user_to_save: UserSchemas.Update) -> None:
         pass
 
     @abstractmethod
-    def create_user(self, user_to_create: UserSchemas.Create) -> None:
+    def update_user_hashed_password(self, username: str, hashed_password: str) -> None:
         pass
 
+    @abstractmethod
+    def create_user(self, user_to_create: UserSchemas.Create) -> UserSchemas.Get:
+        pass
 
+
+@timed_methods(db_crud_duration_seconds)
 class UserDBCRUD(UserCrud):
 
     def __init__(self, current_session: Session):
         self.current_session = current_session
 
     def get_user_by_username(self, username: str) -> UserSchemas.Get:
-        current_user = self.current_session.query(models.User).filter(
-            models.User.username == username).first()
+        current_user = self.current_session.execute(
+            select(*USER_COLUMNS).where(User.username == username)).first()
         if current_user is None:
             raise HTTPException400
-        user_to_return = UserSchemas.Get(**current_user.__dict__)
+        user_to_return = UserSchemas.Get(**current_user._mapping)
         return user_to_return
 
     def get_user_hashed_password_from_username(self, username: str) -> str:
-        current_user = self.current_session.query(models.User).filter(
-            models.User.username == username).first()
-        if current_user is None:
+        hashed_password = self.current_session.scalar(
+            select(User.hashed_password).where(User.username == username))
+        if hashed_password is None:
+            raise HTTPException400
+        return hashed_password
+
+    def get_user_credentials(self, username: str) -> UserSchemas.Credentials:
+        credentials = self.current_session.execute(
+            select(*CREDENTIALS_COLUMNS).where(User.username == username)).first()
+        if credentials is None:
             raise HTTPException400
-        return current_user.hashed_password
+        return UserSchemas.Credentials(*credentials)
 
     def save_user(self, user_to_save: UserSchemas.Update) -> None:
-        current_user: User = self.current_session.query(
-            models.User).get(user_to_save.id)
-        dict_current_user = user_to_save.dict(
-            exclude={'id', 'hashed_password'}).items()
-        for key, value in dict_current_user:
-            if value is not None:
-                setattr(current_user, key, value)
+        hashed_password = None
         if user_to_save.password is not None:
-            new_hashed_password = secret_manager.hash_secret(
-                user_to_save.password)
-            current_user.hashed_password = new_hashed_password
-        self.current_session.flush()
+            hashed_password = get_secret_manager().hash_secret(user_to_save.password)
+        statement = build_user_update(user_to_save, hashed_password)
+        if statement is None:
+            return
+        previous_username = None
+        if user_to_save.username is not None:
+            # a rename must drop the principal cached under the old name too
+            previous_username = self.current_session.scalar(
+                select(User.username).where(User.id == user_to_save.id))
+        try:
+            username = self.current_session.scalar(statement)
+        except IntegrityError as exc:
+            raise HTTPException409 from exc
+        if username is None:
+            raise HTTPException400
+        invalidate_principal_on_commit(self.current_session, username, previous_username)
 
-    def create_user(self, user_to_create: UserSchemas.Create) -> None:
-        hashed_password = secret_manager.hash_secret(user_to_create.password)
+    def update_user_hashed_password(self, username: str, hashed_password: str) -> None:
+        self.current_session.execute(
+            update(User)
+            .where(User.username == username)
+            .values(hashed_password=hashed_password))
+
+    def create_user(self, user_to_create: UserSchemas.Create) -> UserSchemas.Get:
+        hashed_password = get_secret_manager().hash_secret(user_to_create.password)
         new_user = User(
             username=user_to_create.username,
             email=user_to_create.email,
@@ -111,3 +412,158 @@ class UserDBCRUD(UserCrud):
             self.current_session.flush()
         except IntegrityError as exc: 
             raise HTTPException409 from exc
+        return UserSchemas.Get(**new_user.__dict__)
+
+
+class AsyncUserCrud(ABC):
+
+    @abstractmethod
+    async def get_user_by_username(self, username: str) -> UserSchemas.Get:
+        pass
+
+    @abstractmethod
+    async def get_user_hashed_password_from_username(self, username: str) -> str:
+        pass
+
+    @abstractmethod
+    async def get_user_credentials(self, username: str) -> UserSchemas.Credentials:
+        pass
+
+    @abstractmethod
+    async def save_user(self, user_to_save: UserSchemas.Update) -> None:
+        pass
+
+    @abstractmethod
+    async def update_user_hashed_password(self, username: str, hashed_password: str) -> None:
+        pass
+
+    @abstractmethod
+    async def create_user(self, user_to_create: UserSchemas.Create) -> UserSchemas.Get:
+        pass
+
+    @abstractmethod
+    async def create_users(self, users_to_create: list[UserSchemas.Create]
+                           ) -> UserSchemas.CreateBatchResult:
+        pass
+
+
+@timed_methods(db_crud_duration_seconds)
+class UserAsyncDBCRUD(AsyncUserCrud):
+
+    def __init__(self, current_session: AsyncSession):
+        self.current_session = current_session
+
+    async def get_user_by_username(self, username: str) -> UserSchemas.Get:
+        result = await self.current_session.execute(
+            select(*USER_COLUMNS).where(User.username == username))
+        current_user = result.first()
+        if current_user is None:
+            raise HTTPException400
+        user_to_return = UserSchemas.Get(**current_user._mapping)
+        return user_to_return
+
+    async def get_user_hashed_password_from_username(self, username: str) -> str:
+        hashed_password = await self.current_session.scalar(
+            select(User.hashed_password).where(User.username == username))
+        if hashed_password is None:
+            raise HTTPException400
+        return hashed_password
+
+    async def get_user_credentials(self, username: str) -> UserSchemas.Credentials:
+        result = await self.current_session.execute(
+            select(*CREDENTIALS_COLUMNS).where(User.username == username))
+        credentials = result.first()
+        if credentials is None:
+            raise HTTPException400
+        return UserSchemas.Credentials(*credentials)
+
+    async def save_user(self, user_to_save: UserSchemas.Update) -> None:
+        hashed_password = None
+        if user_to_save.password is not None:
+            hashed_password = await get_secret_manager().hash_secret_async(
+                user_to_save.password)
+        statement = build_user_update(user_to_save, hashed_password)
+        if statement is None:
+            return
+        previous_username = None
+        if user_to_save.username is not None:
+            # a rename must drop the principal cached under the old name too
+            previous_username = await self.current_session.scalar(
+                select(User.username).where(User.id == user_to_save.id))
+        try:
+            username = await self.current_session.scalar(statement)
+        except IntegrityError as exc:
+            raise HTTPException409 from exc
+        if username is None:
+            raise HTTPException400
+        invalidate_principal_on_commit(self.current_session.sync_session,
+                                       username, previous_username)
+
+    async def update_user_hashed_password(self, username: str, hashed_password: str) -> None:
+        await self.current_session.execute(
+            update(User)
+            .where(User.username == username)
+            .values(hashed_password=hashed_password))
+
+    async def create_user(self, user_to_create: UserSchemas.Create) -> UserSchemas.Get:
+        hashed_password = await get_secret_manager().hash_secret_async(
+            user_to_create.password)
+        new_user = User(
+            username=user_to_create.username,
+            email=user_to_create.email,
+            hashed_password=hashed_password,
+        )
+        self.current_session.add(new_user)
+        try:
+            await self.current_session.flush()
+        except IntegrityError as exc:
+            raise HTTPException409 from exc
+        return UserSchemas.Get(**new_user.__dict__)
+
+    async def create_users(self, users_to_create: list[UserSchemas.Create]
+                           ) -> UserSchemas.CreateBatchResult:
+        """Creates the users without conflicts and reports the others per row.
+        Known conflicts are found before hashing, users inserted concurrently
+        by someone else are skipped by the insert itself."""
+        conflicts = find_user_conflicts(users_to_create,
+                                        await self._get_taken_values(users_to_create))
+        indexes = [index for index in range(len(users_to_create)) if index not in conflicts]
+        users = [users_to_create[index] for index in indexes]
+        hashed_passwords = await get_secret_manager().hash_secrets_async(
+            [user.password for user in users])
+
+        dialect_name = self.current_session.bind.dialect.name
+        created_by_username = {}
+        for start in range(0, len(users), USER_INSERT_BATCH_SIZE):
+            result = await self.current_session.execute(build_users_insert(
+                dialect_name,
+                users[start:start + USER_INSERT_BATCH_SIZE],
+                hashed_passwords[start:start + USER_INSERT_BATCH_SIZE]))
+            for row in result:
+                created_by_username[row.username] = UserSchemas.Get(**row._mapping)
+
+        skipped = [index for index, user in zip(indexes, users)
+                   if user.username not in created_by_username]
+        if skipped:
+            taken = await self._get_taken_values([users_to_create[index] for index in skipped])
+            for index in skipped:
+                user = users_to_create[index]
+                fields = [field for field in UNIQUE_USER_FIELDS
+                          if getattr(user, field) in taken[field]]
+                conflicts[index] = UserSchemas.Conflict(index=index, username=user.username,
+                                                        fields=fields)
+        return UserSchemas.CreateBatchResult(
+            created=[created_by_username[user.username] for user in users
+                     if user.username in created_by_username],
+            conflicts=[conflicts[index] for index in sorted(conflicts)],
+        )
+
+    async def _get_taken_values(self, users: list[UserSchemas.Create]) -> dict[str, set[str]]:
+        taken = {field: set() for field in UNIQUE_USER_FIELDS}
+        for start in range(0, len(users), USER_INSERT_BATCH_SIZE):
+            result = await self.current_session.execute(
+                build_taken_values_select(users[start:start + USER_INSERT_BATCH_SIZE]))
+            for username, email in result:
+                taken['username'].add(username)
+                taken['email'].add(email)
+        return taken
@@ -0,0 +1,265 @@
+"""In-process HTTP load benchmark of the API.
+
+Drives `src.main.app` through httpx's ASGI transport, so the numbers cover
+routing, validation, auth, hashing and the database without any network or
+server overhead. Every worker logs in as its own user. Login throttling is
+disabled, all requests come from one client address.
+
+    python -m src.benchmarks.http_load --concurrency 16 --requests 1000
+    python -m src.benchmarks.http_load --database-url sqlite+aiosqlite:///bench.db
+    python -m src.benchmarks.http_load --scenario login --save-baseline
+
+Scenarios relying on postgres only SQL (history insert, statistics) are
+skipped on other databases. A scenario with failed requests fails the run and
+isn't saved as a baseline, its timings measure the errors.
+"""
+import argparse
+import asyncio
+import sys
+from itertools import count
+from pathlib import Path
+from secrets import token_hex
+from time import perf_counter
+from typing import Awaitable, Callable
+import httpx
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from ..auth.throttling import DisabledThrottleBackend, get_login_throttle
+from ..main import create_app
+from ..database import Base, AsyncSessionLocal, get_async_engine
+from .stats import (
+    BASELINES_DIR,
+    summarize_latencies,
+    load_baselines,
+    save_baselines,
+    relative_change,
+)
+
+BENCHMARK_PASSWORDS = ('benchmark-password', 'benchmark-password-2')
+
+
+class BenchmarkUser:
+    def __init__(self, username: str) -> None:
+        self.username = username
+        self.password = BENCHMARK_PASSWORDS[0]
+        self.headers: dict[str, str] = {}
+
+    @property
+    def other_password(self) -> str:
+        return BENCHMARK_PASSWORDS[self.password == BENCHMARK_PASSWORDS[0]]
+
+
+RequestFunc = Callable[[httpx.AsyncClient, BenchmarkUser], Awaitable[httpx.Response]]
+
+_usernames = count()
+_run_id = 'b' + token_hex(3)
+
+
+def new_username() -> str:
+    return f'{_run_id}{next(_usernames)}'
+
+
+async def create_user(client: httpx.AsyncClient, user: BenchmarkUser | None = None) -> httpx.Response:
+    username = user.username if user is not None else new_username()
+    return await client.post('/authorization/user', json={
+        'username': username,
+        'email': f'{username}@benchmark.local',
+        'password': BENCHMARK_PASSWORDS[0],
+    })
+
+
+async def login(client: httpx.AsyncClient, user: BenchmarkUser) -> httpx.Response:
+    response = await client.post('/authorization', data={
+        'username': user.username, 'password': user.password})
+    if response.status_code == 200:
+        user.headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+    return response
+
+
+async def update_password(client: httpx.AsyncClient, user: BenchmarkUser) -> httpx.Response:
+    new_password = user.other_password
+    response = await client.post('/authorization/update_password', headers=user.headers, json={
+        'old_password': user.password, 'new_password': new_password})
+    if response.status_code == 200:
+        user.password = new_password
+    return response
+
+
+async def get_settings(client: httpx.AsyncClient, user: BenchmarkUser) -> httpx.Response:
+    return await client.get('/api/pomodoro/settings', headers=user.headers)
+
+
+async def update_settings(client: httpx.AsyncClient, user: BenchmarkUser) -> httpx.Response:
+    return await client.put('/api/pomodoro/settings', headers=user.headers,
+                            json={'work_duration': 30})
+
+
+async def create_history(client: httpx.AsyncClient, user: BenchmarkUser) -> httpx.Response:
+    return await client.post('/api/pomodoro/history', headers=user.headers,
+                             json={'intervals': [{'duration_in_seconds': 1500}]})
+
+
+async def get_history(client: httpx.AsyncClient, user: BenchmarkUser) -> httpx.Response:
+    return await client.get('/api/pomodoro/history', headers=user.headers)
+
+
+async def get_statistics(client: httpx.AsyncClient, user: BenchmarkUser) -> httpx.Response:
+    return await client.get('/api/pomodoro/statistics', headers=user.headers)
+
+
+SCENARIOS: dict[str, RequestFunc] = {
+    'create_user': lambda client, user: create_user(client),
+    'login': login,
+    'update_password': update_password,
+    'get_settings': get_settings,
+    'update_settings': update_settings,
+    'create_history': create_history,
+    'get_history': get_history,
+    'get_statistics': get_statistics,
+}
+POSTGRES_ONLY_SCENARIOS = {'create_history', 'get_statistics'}
+
+
+async def run_scenario(client: httpx.AsyncClient,
+                       request: RequestFunc,
+                       users: list[BenchmarkUser],
+                       number_of_requests: int,
+                       number_of_warmup_requests: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = number_of_warmup_requests
+
+    async def worker(user: BenchmarkUser, is_recorded: bool) -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started_at = perf_counter()
+            response = await request(client, user)
+            if is_recorded:
+                latencies.append(perf_counter() - started_at)
+                errors += response.status_code >= 400
+
+    await asyncio.gather(*(worker(user, is_recorded=False) for user in users))
+    remaining = number_of_requests
+    started_at = perf_counter()
+    await asyncio.gather(*(worker(user, is_recorded=True) for user in users))
+    return summarize_latencies(latencies, perf_counter() - started_at, errors)
+
+
+async def prepare_users(client: httpx.AsyncClient, number_of_users: int) -> list[BenchmarkUser]:
+    users = [BenchmarkUser(new_username()) for _ in range(number_of_users)]
+    for user in users:
+        for prepare in (create_user, login):
+            response = await prepare(client, user)
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f'Could not prepare {user.username}: {response.status_code} {response.text}')
+    return users
+
+
+async def bind_database(database_url: str | None) -> AsyncEngine:
+    """Points the app sessions to `database_url` and creates missing tables."""
+    if database_url is None:
+        return get_async_engine()
+    benchmark_engine = create_async_engine(database_url)
+    async with benchmark_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    AsyncSessionLocal.configure(bind=benchmark_engine)
+    return benchmark_engine
+
+
+async def run_benchmarks(scenario_names: list[str],
+                         concurrency: int,
+                         number_of_requests: int,
+                         number_of_warmup_requests: int,
+                         database_url: str | None) -> dict[str, dict]:
+    benchmark_engine = await bind_database(database_url)
+    if benchmark_engine.dialect.name != 'postgresql':
+        skipped = POSTGRES_ONLY_SCENARIOS.intersection(scenario_names)
+        if skipped:
+            print(f'Skipping postgres only scenarios: {", ".join(sorted(skipped))}')
+        scenario_names = [name for name in scenario_names if name not in skipped]
+
+    results = {}
+    # warmup would connect the configured database, the warmup requests cover it
+    app = create_app(is_warmup_enabled=False)
+    login_throttle = get_login_throttle()
+    throttle_backend, login_throttle.backend = login_throttle.backend, DisabledThrottleBackend()
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+            users = await prepare_users(client, concurrency)
+            for name in scenario_names:
+                result = await run_scenario(client, SCENARIOS[name], users,
+                                            number_of_requests, number_of_warmup_requests)
+                results[f'{name}[concurrency={concurrency}]'] = result
+    finally:
+        await app.router.shutdown()
+        login_throttle.backend = throttle_backend
+        if database_url is not None:
+            await benchmark_engine.dispose()
+    return results
+
+
+def report(results: dict[str, dict], baselines: dict[str, dict], max_regression: float | None) -> bool:
+    """Prints results next to their baselines, returns False on failed
+    requests or on a regression above `max_regression`."""
+    is_passed = True
+    print(f'{"scenario":<40}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}'
+          f'{"errors":>8}{"req/s Δ":>10}{"p95 Δ":>10}')
+    for name, result in results.items():
+        baseline = baselines.get(name, {})
+        throughput_change = relative_change(result['throughput'], baseline.get('throughput'))
+        latency_change = relative_change(result['p95_ms'], baseline.get('p95_ms'))
+        print(f'{name:<40}{result["throughput"]:>10.1f}{result["p50_ms"]:>10.2f}'
+              f'{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}{result["errors"]:>8}'
+              f'{_format_change(throughput_change):>10}{_format_change(latency_change):>10}')
+        if result['errors']:
+            print(f'  {result["errors"]} of {result["requests"]} requests failed in {name}')
+            is_passed = False
+        if max_regression is not None and (
+                (throughput_change is not None and -throughput_change > max_regression)
+                or (latency_change is not None and latency_change > max_regression)):
+            print(f'  regression above {max_regression:.0%} in {name}')
+            is_passed = False
+    return is_passed
+
+
+def _format_change(change: float | None) -> str:
+    return '-' if change is None else f'{change:+.1%}'
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS),
+                        help='may be repeated, all scenarios by default')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500,
+                        help='recorded requests per scenario')
+    parser.add_argument('--warmup', type=int, default=50,
+                        help='unrecorded requests per scenario')
+    parser.add_argument('--database-url',
+                        help='async database url, the configured database by default')
+    parser.add_argument('--baseline', type=Path, default=BASELINES_DIR / 'http_load.json')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--max-regression', type=float,
+                        help='fail when throughput or p95 is worse by this fraction, e.g. 0.1')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    arguments = parse_arguments(argv)
+    results = asyncio.run(run_benchmarks(arguments.scenario or list(SCENARIOS),
+                                         arguments.concurrency,
+                                         arguments.requests,
+                                         arguments.warmup,
+                                         arguments.database_url))
+    is_passed = report(results, load_baselines(arguments.baseline), arguments.max_regression)
+    if arguments.save_baseline:
+        save_baselines(arguments.baseline,
+                       {name: result for name, result in results.items() if not result['errors']})
+    return 0 if is_passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
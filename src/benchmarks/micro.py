@@ -0,0 +1,235 @@
+"""Micro-benchmarks of hot functions with baseline regression gates.
+
+Every benchmark is warmed up, then timed `--repeat` times; each repetition
+runs enough calls to last at least `--min-sample-time`. The median per call
+time is compared with the stored baseline and the run fails when it is
+slower by more than `--tolerance`.
+
+    python -m src.benchmarks.micro
+    python -m src.benchmarks.micro --group secret --group schemas --save-baseline
+    python -m src.benchmarks.micro --group crud --database-url sqlite://
+
+The crud group works inside a transaction that is rolled back. History
+inserts need postgres and are skipped on other databases.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from ..database import Base, get_engine
+from ..auth.dependencies import get_current_user
+from ..auth.models import User
+from ..auth.schemas import UserSchemas
+from ..auth.utils import get_secret_manager, get_principal_cache
+from ..pomodoro.schemas import PomodoroSchemas, HistorySchemas
+from ..pomodoro.utils import PomodoroCRUDDB
+from .stats import (
+    BASELINES_DIR,
+    summarize_samples,
+    load_baselines,
+    save_baselines,
+    relative_change,
+    is_regression,
+)
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_USERNAME = 'microbenchmark'
+HISTORY_BATCH_SIZE = 100
+
+Benchmarks = dict[str, Callable[[], object]]
+
+
+def measure(func: Callable[[], object],
+            repeat: int,
+            warmup: int,
+            min_sample_time: float) -> dict:
+    for _ in range(warmup):
+        func()
+    number = _calibrate(func, min_sample_time)
+    samples = []
+    for _ in range(repeat):
+        started_at = perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((perf_counter() - started_at) / number)
+    return summarize_samples(samples, number)
+
+
+def _calibrate(func: Callable[[], object], min_sample_time: float) -> int:
+    """Smallest power of two of calls lasting at least `min_sample_time`."""
+    number = 1
+    while True:
+        started_at = perf_counter()
+        for _ in range(number):
+            func()
+        if perf_counter() - started_at >= min_sample_time:
+            return number
+        number *= 2
+
+
+def secret_benchmarks() -> Benchmarks:
+    secret_manager = get_secret_manager()
+    hashed_password = secret_manager.hash_secret(BENCHMARK_PASSWORD)
+    legacy_hashed_password = secret_manager.pwd_context.hash(
+        secret_manager.pepper_secret_by_bcrypt(BENCHMARK_PASSWORD))
+    return {
+        'secret.hash_secret': lambda: secret_manager.hash_secret(BENCHMARK_PASSWORD),
+        'secret.verify_and_update': lambda: secret_manager.verify_and_update(
+            hashed_password, BENCHMARK_PASSWORD),
+        'secret.verify_and_update[legacy]': lambda: secret_manager.verify_and_update(
+            legacy_hashed_password, BENCHMARK_PASSWORD),
+        'secret.generate_jwt_token': lambda: secret_manager.generate_jwt_token(
+            {'sub': BENCHMARK_USERNAME}),
+    }
+
+
+def auth_benchmarks() -> Benchmarks:
+    """`get_current_user` with a cached principal, i.e. the JWT decode path.
+    Includes the cost of driving the coroutine on an event loop."""
+    user = UserSchemas.Get(id=1, username=BENCHMARK_USERNAME,
+                           email='micro@benchmark.local', is_active=True)
+    get_principal_cache().set(user.username, user)
+    token = get_secret_manager().generate_jwt_token({'sub': user.username})
+    loop = asyncio.new_event_loop()
+    return {
+        'auth.get_current_user[cached]': lambda: loop.run_until_complete(
+            get_current_user(token)),
+    }
+
+
+def schemas_benchmarks() -> Benchmarks:
+    user = {'id': 1, 'username': BENCHMARK_USERNAME,
+            'email': 'micro@benchmark.local', 'is_active': True}
+    pomodoro = {'id': 1, 'user_id': 1, 'short_rest_duration': 5,
+                'long_rest_duration': 15, 'work_duration': 25, 'number_of_sessions': 4}
+    return {
+        'schemas.UserSchemas.Get': lambda: UserSchemas.Get(**user),
+        'schemas.PomodoroSchemas.ReadCreate': lambda: PomodoroSchemas.ReadCreate(**pomodoro),
+    }
+
+
+def crud_benchmarks(session: Session) -> Benchmarks:
+    user = User(username=BENCHMARK_USERNAME, email='micro@benchmark.local',
+                hashed_password='not-a-hash', is_active=True)
+    session.add(user)
+    session.flush()
+    crud = PomodoroCRUDDB(session)
+    settings = crud.get_pomodoro_settings_by(user_id=user.id)
+    new_settings = PomodoroSchemas.Update(user_id=user.id, work_duration=30)
+    interval = HistorySchemas.Interval(duration_in_seconds=1500, utc_end=datetime.utcnow())
+    history = HistorySchemas.Create(user_id=user.id, **interval.dict())
+    benchmarks = {
+        'crud.get_pomodoro_settings_by[id]': lambda: crud.get_pomodoro_settings_by(
+            id_=settings.id),
+        'crud.get_pomodoro_settings_by[user_id]': lambda: crud.get_pomodoro_settings_by(
+            user_id=user.id),
+        'crud.save_pomodoro_settings': lambda: crud.save_pomodoro_settings(new_settings),
+    }
+    if session.get_bind().dialect.name == 'postgresql':
+        benchmarks |= {
+            'crud.create_pomodoro_history': lambda: crud.create_pomodoro_history(history),
+            f'crud.create_pomodoro_history_batch[{HISTORY_BATCH_SIZE}]':
+                lambda: crud.create_pomodoro_history_batch(
+                    user.id, [interval] * HISTORY_BATCH_SIZE),
+        }
+    else:
+        print('Skipping postgres only history benchmarks')
+    return benchmarks
+
+
+GROUPS = ('secret', 'auth', 'schemas', 'crud')
+
+
+def run_benchmarks(groups: list[str],
+                   repeat: int,
+                   warmup: int,
+                   min_sample_time: float,
+                   database_url: str | None) -> dict[str, dict]:
+    benchmarks: Benchmarks = {}
+    if 'secret' in groups:
+        benchmarks |= secret_benchmarks()
+    if 'auth' in groups:
+        benchmarks |= auth_benchmarks()
+    if 'schemas' in groups:
+        benchmarks |= schemas_benchmarks()
+    if 'crud' not in groups:
+        return _measure_all(benchmarks, repeat, warmup, min_sample_time)
+
+    benchmark_engine = get_engine()
+    if database_url is not None:
+        benchmark_engine = create_engine(database_url)
+        Base.metadata.create_all(benchmark_engine)
+    with Session(benchmark_engine, autoflush=False) as session:
+        try:
+            benchmarks |= crud_benchmarks(session)
+            return _measure_all(benchmarks, repeat, warmup, min_sample_time)
+        finally:
+            session.rollback()
+
+
+def _measure_all(benchmarks: Benchmarks, repeat: int, warmup: int, min_sample_time: float) -> dict[str, dict]:
+    return {name: measure(func, repeat, warmup, min_sample_time)
+            for name, func in benchmarks.items()}
+
+
+def report(results: dict[str, dict], baselines: dict[str, dict], tolerance: float) -> bool:
+    """Prints results next to their baselines, returns False when a median
+    is slower than its baseline by more than `tolerance`."""
+    is_passed = True
+    print(f'{"benchmark":<48}{"calls":>12}{"median µs":>14}{"min µs":>14}'
+          f'{"stdev":>8}{"baseline µs":>14}{"change":>9}')
+    for name, result in results.items():
+        baseline = baselines.get(name, {})
+        change = relative_change(result['median_us'], baseline.get('median_us'))
+        spread = result['stdev_us'] / result['median_us'] if result['median_us'] else 0.0
+        is_regressed = is_regression(result, baseline, 'median_us', tolerance)
+        is_passed = is_passed and not is_regressed
+        print(f'{name:<48}{result["number"]:>6}x{result["repeat"]:<5}'
+              f'{result["median_us"]:>14.2f}{result["min_us"]:>14.2f}{spread:>8.1%}'
+              f'{_format_optional(baseline.get("median_us"), ".2f"):>14}'
+              f'{_format_optional(change, "+.1%"):>9}'
+              f'{"  REGRESSION" if is_regressed else ""}')
+    return is_passed
+
+
+def _format_optional(value: float | None, format_spec: str) -> str:
+    return '-' if value is None else format(value, format_spec)
+
+
+def parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--group', action='append', choices=GROUPS,
+                        help='may be repeated, all groups by default')
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--warmup', type=int, default=3, help='untimed calls')
+    parser.add_argument('--min-sample-time', type=float, default=0.05,
+                        help='minimal duration of one repetition in seconds')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown of the median, e.g. 0.2 for 20%%')
+    parser.add_argument('--database-url',
+                        help='sync database url of the crud group, the configured database by default')
+    parser.add_argument('--baseline', type=Path, default=BASELINES_DIR / 'micro.json')
+    parser.add_argument('--save-baseline', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    arguments = parse_arguments(argv)
+    results = run_benchmarks(arguments.group or list(GROUPS),
+                             arguments.repeat,
+                             arguments.warmup,
+                             arguments.min_sample_time,
+                             arguments.database_url)
+    is_passed = report(results, load_baselines(arguments.baseline), arguments.tolerance)
+    if arguments.save_baseline:
+        save_baselines(arguments.baseline, results)
+    return 0 if is_passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Latency summaries and JSON baselines shared by the benchmark suites."""
+import json
+from math import ceil
+from statistics import median, stdev
+from pathlib import Path
+
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: list[float], elapsed: float, errors: int) -> dict:
+    """Throughput and p50/p95/p99 in milliseconds of one benchmark run."""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def summarize_samples(samples: list[float], number: int) -> dict:
+    """Per call time in microseconds of `len(samples)` repetitions, each
+    timing `number` calls."""
+    return {
+        'number': number,
+        'repeat': len(samples),
+        'median_us': median(samples) * 1e6,
+        'min_us': min(samples) * 1e6,
+        'stdev_us': stdev(samples) * 1e6 if len(samples) > 1 else 0.0,
+    }
+
+
+def load_baselines(path: Path) -> dict[str, dict]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baselines(path: Path, results: dict[str, dict]) -> None:
+    baselines = load_baselines(path)
+    baselines.update(results)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+
+
+def relative_change(current: float, baseline: float) -> float | None:
+    if not baseline:
+        return None
+    return (current - baseline) / baseline
+
+
+def is_regression(result: dict, baseline: dict, key: str, tolerance: float) -> bool:
+    """True when `key` of `result` grew by more than `tolerance` (a fraction)
+    over the baseline. Missing baselines never regress."""
+    change = relative_change(result[key], baseline.get(key))
+    return change is not None and change > tolerance
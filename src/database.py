@@ -1,5 +1,21 @@
+import asyncio
+import logging
+from functools import lru_cache
+from threading import Lock
+from time import perf_counter
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseSettings
 
@@ -7,21 +23,190 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
     DB_DRIVER: str
+    DB_ASYNC_DRIVER: str = 'postgresql+asyncpg'
     DB_HOST: str
     DB_PORT: str
     DB_USER: str
     DB_PASS: str
     DB_NAME: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
 
     @property
     def DATABASE_URL(self):
         return f"{self.DB_DRIVER}://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
-settings = Settings()
-database_url = settings.DATABASE_URL
-print(f"{database_url=}")
-engine = create_engine(url=database_url)
+    @property
+    def ASYNC_DATABASE_URL(self):
+        return f"{self.DB_ASYNC_DRIVER}://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
+    @property
+    def POOL_OPTIONS(self) -> dict:
+        return {
+            'pool_size': self.DB_POOL_SIZE,
+            'max_overflow': self.DB_MAX_OVERFLOW,
+            'pool_timeout': self.DB_POOL_TIMEOUT,
+            'pool_recycle': self.DB_POOL_RECYCLE,
+            'pool_pre_ping': self.DB_POOL_PRE_PING,
+        }
+
+
+class PoolStatistics:
+    """Checkout counters of a pool, kept across `engine.dispose()`."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._lock = Lock()
+
+    def record_checkout(self, wait_time: float, is_timed_out: bool) -> None:
+        with self._lock:
+            if is_timed_out:
+                self.checkout_timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+
+
+class _InstrumentedPoolMixin:
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.statistics = PoolStatistics()
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.statistics = self.statistics
+        return new_pool
+
+    def _do_get(self):
+        started_at = perf_counter()
+        is_timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            is_timed_out = True
+            raise
+        finally:
+            self.statistics.record_checkout(perf_counter() - started_at, is_timed_out)
+
+    def get_statistics(self) -> dict:
+        return {
+            'size': self.size(),
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': self.overflow(),
+            'checkouts': self.statistics.checkouts,
+            'checkout_timeouts': self.statistics.checkout_timeouts,
+            'wait_time_total': self.statistics.wait_time_total,
+            'wait_time_max': self.statistics.wait_time_max,
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+@lru_cache
+def get_engine() -> Engine:
+    settings = get_settings()
+    return create_engine(url=settings.DATABASE_URL,
+                         poolclass=InstrumentedQueuePool,
+                         **settings.POOL_OPTIONS)
+
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    settings = get_settings()
+    return create_async_engine(url=settings.ASYNC_DATABASE_URL,
+                               poolclass=InstrumentedAsyncAdaptedQueuePool,
+                               **settings.POOL_OPTIONS)
+
+
+class _LazySession(Session):
+    """Binds to `get_engine()` unless a bind is configured, so the engine
+    is built by the first session instead of at import."""
+
+    def __init__(self, bind=None, **kwargs) -> None:
+        super().__init__(bind=bind if bind is not None else get_engine(), **kwargs)
+
+
+class _LazyAsyncSession(AsyncSession):
+    def __init__(self, bind=None, **kwargs) -> None:
+        super().__init__(bind=bind if bind is not None else get_async_engine(), **kwargs)
+
+
+SessionLocal = sessionmaker(class_=_LazySession, autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(
+    class_=_LazyAsyncSession, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+_lazy_attributes = {
+    'settings': get_settings,
+    'database_url': lambda: get_settings().DATABASE_URL,
+    'engine': get_engine,
+    'async_engine': get_async_engine,
+}
+
+
+def __getattr__(name: str):
+    if name in _lazy_attributes:
+        return _lazy_attributes[name]()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def get_pool_statistics() -> dict[str, dict]:
+    return {
+        'sync': get_engine().pool.get_statistics(),
+        'async': get_async_engine().pool.get_statistics(),
+    }
+
+
+async def prefill_async_pool(number_of_connections: int) -> None:
+    """Opens `number_of_connections` at once and returns them to the pool,
+    so the first requests don't pay for connecting."""
+    connections = [get_async_engine().connect() for _ in range(number_of_connections)]
+    results = await asyncio.gather(*(connection.start() for connection in connections),
+                                   return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        logger.warning('Could not prefill the connection pool: %s', errors[0])
+    await asyncio.gather(*(connection.close() for connection in connections
+                           if connection.sync_connection is not None))
+
+
+async def dispose_engines() -> None:
+    """Closes the pooled connections of the engines built so far."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+
+
+_INSERTS_BY_DIALECT = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert,
+}
 
-SessionLocal = sessionmaker(autocommit=False ,autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+def get_dialect_insert(dialect_name: str):
+    """`insert` of the dialect, which supports ON CONFLICT clauses."""
+    return _INSERTS_BY_DIALECT[dialect_name]
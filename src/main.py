@@ -1,17 +1,92 @@
+import asyncio
+from functools import lru_cache
+from sqlalchemy.orm import configure_mappers
 from src.auth.router import auth_router # app depend
-from os import environ
+from src.auth.utils import get_secret_manager
+from src.auth.tokens import get_jwt_key_ring
+from src.pomodoro.router import pomodoro_router
+from src.pomodoro.buffer import start_history_buffer, stop_history_buffer
+from src.pomodoro.timer import start_timer_service, stop_timer_service
+from src.admin.router import admin_router
+from src.monitoring.router import monitoring_router
+from src.monitoring.middleware import MetricsMiddleware, SQLProfilerMiddleware, RoutePathResolver
+from src.monitoring.profiler import attach_sql_profiler
+from src.monitoring.constants import get_monitoring_env
+from src.database import (get_settings, get_engine, get_async_engine, prefill_async_pool,
+                          dispose_engines)
 from fastapi import FastAPI, APIRouter
-import uvicorn
-app = FastAPI()
+from fastapi.responses import ORJSONResponse
 
-# { Your app routers
-app.include_router(auth_router)
-# }
+
+async def warm_up(app: FastAPI) -> None:
+    """Moves one-off costs out of the first requests: mapper configuration,
+    the OpenAPI schema, JWT keys, pool connections and hashing worker processes."""
+    configure_mappers()
+    get_jwt_key_ring()
+    app.openapi()
+    await asyncio.gather(
+        prefill_async_pool(get_settings().DB_POOL_SIZE),
+        get_secret_manager().executor.warm_up(),
+    )
+
+
+def create_app(is_warmup_enabled: bool = True) -> FastAPI:
+    """Builds the application. Settings, engines and the secret manager are
+    created on first use, so importing this module reads and connects nothing.
+
+    Serve it with `python -m src.server`, which calls it in every worker,
+    or `uvicorn --factory src.main:create_app`.
+    """
+    monitoring_env = get_monitoring_env()
+    app = FastAPI(default_response_class=ORJSONResponse)
+    route_resolver = RoutePathResolver(app.routes)
+    app.add_middleware(SQLProfilerMiddleware,
+                       route_resolver=route_resolver,
+                       query_count_threshold=monitoring_env.QUERY_COUNT_THRESHOLD,
+                       is_debug=monitoring_env.DEBUG)
+    app.add_middleware(MetricsMiddleware, route_resolver=route_resolver)
+
+    @app.on_event('startup')
+    async def startup():
+        for engine in (get_engine(), get_async_engine().sync_engine):
+            attach_sql_profiler(engine, monitoring_env.SLOW_QUERY_THRESHOLD_IN_MS)
+        if is_warmup_enabled:
+            await warm_up(app)
+        await start_history_buffer()
+        await start_timer_service()
+
+    @app.on_event('shutdown')
+    async def shutdown():
+        # stopped timers record nothing more, the buffer then drains
+        await stop_timer_service()
+        await stop_history_buffer()
+        get_secret_manager().executor.shutdown()
+        await dispose_engines()
+
+    # { Your app routers
+    app.include_router(auth_router)
+    app.include_router(monitoring_router)
+    # }
+
+    api_router = APIRouter(prefix='/api')
+    api_router.include_router(pomodoro_router)
+    api_router.include_router(admin_router)
+    app.include_router(api_router)
+    return app
+
+
+@lru_cache
+def get_app() -> FastAPI:
+    return create_app()
+
+
+def __getattr__(name: str):
+    # `src.main:app` keeps working for uvicorn and tests
+    if name == 'app':
+        return get_app()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
-api_router = APIRouter(prefix='/api')
-app.include_router(api_router)
 if __name__ == "__main__":
-    host = environ.get('TEST_HOST')
-    port = environ.get('TEST_PORT')
-    uvicorn.run(app, host=host, port=port)
+    from src.server import main
+    main()
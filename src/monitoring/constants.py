@@ -0,0 +1,20 @@
+from functools import lru_cache
+from pydantic import BaseSettings
+
+
+class MonitoringEnv(BaseSettings):
+    class Config:
+        env_file = '.env'
+    DEBUG: bool = False
+    SLOW_QUERY_THRESHOLD_IN_MS: float = 100
+    QUERY_COUNT_THRESHOLD: int = 10
+
+
+QUERY_COUNT_HEADER = 'X-DB-Query-Count'
+QUERY_TIME_HEADER = 'X-DB-Time-Ms'
+
+
+
+@lru_cache
+def get_monitoring_env() -> MonitoringEnv:
+    return MonitoringEnv()
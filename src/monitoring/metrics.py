@@ -0,0 +1,183 @@
+"""Minimal Prometheus compatible metrics, rendered in the text exposition format."""
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[labelname]) for labelname in self.labelnames)
+
+    def _format_labels(self, label_values: tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"'
+                 for name, value in zip(self.labelnames, label_values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        for label_values, value in self._values.items():
+            yield f'{self.name}{self._format_labels(label_values)} {value}'
+
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = buckets
+        # per label values: [count per bucket..., count in +Inf only], sum
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started_at = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - started_at, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for label_values, (counts, total) in self._values.items():
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = self._format_labels(label_values, f'le="{upper_bound}"')
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            cumulative += counts[-1]
+            labels = self._format_labels(label_values, 'le="+Inf"')
+            yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{self._format_labels(label_values)} {total[0]}'
+            yield f'{self.name}_count{self._format_labels(label_values)} {cumulative}'
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """`collector` runs before every render, to refresh gauges of live values."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def timed(histogram: Histogram, **labels: str) -> Callable:
+    """Decorator observing the duration of sync and async functions."""
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with histogram.time(**labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_methods(histogram: Histogram) -> Callable[[type], type]:
+    """Class decorator applying `timed` to every public method of the class,
+    labelled with `crud` (class name) and `method`."""
+    def decorator(cls: type) -> type:
+        for name, attribute in list(vars(cls).items()):
+            if not name.startswith('_') and callable(attribute):
+                setattr(cls, name, timed(
+                    histogram, crud=cls.__name__, method=name)(attribute))
+        return cls
+    return decorator
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    'http_requests_total', 'HTTP requests by route and status.',
+    ('method', 'route', 'status')))
+http_request_duration_seconds = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route.',
+    ('method', 'route')))
+http_requests_in_flight = registry.register(Gauge(
+    'http_requests_in_flight', 'HTTP requests being processed.'))
+password_hashing_duration_seconds = registry.register(Histogram(
+    'password_hashing_duration_seconds',
+    'Time spent hashing or verifying secrets, including the wait for a worker.',
+    ('operation',)))
+jwt_duration_seconds = registry.register(Histogram(
+    'jwt_duration_seconds', 'Time spent encoding or decoding JWT tokens.',
+    ('operation',), buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)))
+db_crud_duration_seconds = registry.register(Histogram(
+    'db_crud_duration_seconds', 'Time spent in CRUD methods, DB round trips included.',
+    ('crud', 'method')))
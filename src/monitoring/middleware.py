@@ -0,0 +1,113 @@
+import logging
+from time import perf_counter
+from starlette.datastructures import MutableHeaders
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import (
+    http_requests_total,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+)
+from .profiler import RequestProfile, current_profile
+from .constants import QUERY_COUNT_HEADER, QUERY_TIME_HEADER
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RoutePathResolver:
+    """Maps the endpoint routing stored in a scope back to its path template,
+    so `/items/1` and `/items/2` are reported as one route."""
+
+    def __init__(self, routes: list[BaseRoute]) -> None:
+        self.routes = routes
+        self._route_paths: dict = {}
+
+    def __call__(self, scope: Scope) -> str:
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if not self._route_paths:
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in self.routes if hasattr(route, 'endpoint')
+            }
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """Records count, latency and in flight requests per route template."""
+
+    def __init__(self, app: ASGIApp, route_resolver: RoutePathResolver) -> None:
+        self.app = app
+        self.route_resolver = route_resolver
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started_at = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = perf_counter() - started_at
+            http_requests_in_flight.dec()
+            route = self.route_resolver(scope)
+            http_request_duration_seconds.observe(
+                duration, method=scope['method'], route=route)
+            http_requests_total.inc(
+                method=scope['method'], route=route, status=status_code)
+
+
+class SQLProfilerMiddleware:
+    """Counts SQL statements and DB time of every request.
+
+    Requests running more than `query_count_threshold` statements are
+    logged with their route. With `is_debug` the totals are also sent
+    as response headers.
+    """
+
+    def __init__(self,
+                 app: ASGIApp,
+                 route_resolver: RoutePathResolver,
+                 query_count_threshold: int,
+                 is_debug: bool = False) -> None:
+        self.app = app
+        self.route_resolver = route_resolver
+        self.query_count_threshold = query_count_threshold
+        self.is_debug = is_debug
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope, self.route_resolver)
+
+        async def send_wrapper(message: Message) -> None:
+            if self.is_debug and message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers[QUERY_COUNT_HEADER] = str(profile.statement_count)
+                headers[QUERY_TIME_HEADER] = f'{profile.db_time * 1000:.2f}'
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            if profile.statement_count > self.query_count_threshold:
+                logger.warning('%s %s ran %d queries in %.1f ms',
+                               scope['method'], profile.route,
+                               profile.statement_count, profile.db_time * 1000)
@@ -0,0 +1,67 @@
+"""Per request SQL statistics collected from SQLAlchemy engine events."""
+import logging
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable
+from weakref import WeakSet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import Scope
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    __slots__ = ('scope', 'route_resolver', 'statement_count', 'db_time')
+
+    def __init__(self, scope: Scope, route_resolver: Callable[[Scope], str]) -> None:
+        self.scope = scope
+        self.route_resolver = route_resolver
+        self.statement_count = 0
+        self.db_time = 0.0
+
+    @property
+    def route(self) -> str:
+        return self.route_resolver(self.scope)
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    'current_profile', default=None)
+
+
+_profiled_engines: WeakSet[Engine] = WeakSet()
+
+
+def attach_sql_profiler(engine: Engine, slow_query_threshold_in_ms: float) -> None:
+    """Counts statements and DB time of `engine` into the current request
+    profile and logs statements slower than `slow_query_threshold_in_ms`.
+
+    Pass `async_engine.sync_engine` for async engines. Attaching an engine
+    twice keeps the first threshold.
+    """
+    if engine in _profiled_engines:
+        return
+    _profiled_engines.add(engine)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started_at', []).append(perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info['query_started_at'].pop()
+        profile = current_profile.get()
+        route = None
+        if profile is not None:
+            profile.statement_count += 1
+            profile.db_time += elapsed
+            route = profile.route
+        if elapsed * 1000 >= slow_query_threshold_in_ms:
+            logger.warning('Slow query %.1f ms on %s: %s', elapsed * 1000, route, statement)
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(exception_context):
+        if exception_context.connection is not None:
+            started_at = exception_context.connection.info.get('query_started_at')
+            if started_at:
+                started_at.pop()
@@ -0,0 +1,42 @@
+from typing import Callable
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..auth.utils import get_principal_cache
+from ..cache import TTLCache
+from ..database import get_pool_statistics
+from ..pomodoro.utils import settings_cache
+from .metrics import registry, Gauge
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+monitoring_router = APIRouter(tags=['MONITORING'])
+
+cache_statistics = registry.register(Gauge(
+    'cache_statistics', 'Hits, misses and size of in-process caches.',
+    ('cache', 'statistic')))
+db_pool_statistics = registry.register(Gauge(
+    'db_pool_statistics', 'Connection pool state and checkout counters.',
+    ('engine', 'statistic')))
+
+caches: dict[str, Callable[[], TTLCache]] = {
+    'principal': get_principal_cache,
+    'pomodoro_settings': lambda: settings_cache,
+}
+
+
+def collect_statistics() -> None:
+    for cache_name, get_cache in caches.items():
+        cache = get_cache()
+        for statistic, value in cache.stats().items():
+            cache_statistics.set(value, cache=cache_name, statistic=statistic)
+    for engine_name, statistics in get_pool_statistics().items():
+        for statistic, value in statistics.items():
+            db_pool_statistics.set(value, engine=engine_name, statistic=statistic)
+
+
+registry.add_collector(collect_statistics)
+
+
+@monitoring_router.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,45 @@
+"""Rebuilds `history_daily_rollup` from `history_of_pomodoro`.
+
+    python -m src.pomodoro.backfill
+"""
+from sqlalchemy import select, func, cast, Date, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from .models import PomodoroHistory, HistoryDailyRollup
+
+
+def backfill_daily_rollup(session: Session) -> int:
+    """Overwrites every rollup row with totals computed from history.
+
+    History is locked against writes until the session ends, so intervals
+    inserted meanwhile can't be counted twice or lost.
+
+    Returns:
+        int: number of written rollup rows.
+    """
+    session.execute(text('LOCK TABLE history_of_pomodoro IN SHARE MODE'))
+    day = cast(PomodoroHistory.utc_end, Date)
+    rollup_insert = pg_insert(HistoryDailyRollup).from_select(
+        ['pomodoro_id', 'day', 'focus_seconds', 'intervals'],
+        select(PomodoroHistory.pomodoro_id,
+               day,
+               func.sum(PomodoroHistory.duration_in_seconds),
+               func.count())
+        .group_by(PomodoroHistory.pomodoro_id, day)
+    )
+    result = session.execute(rollup_insert.on_conflict_do_update(
+        index_elements=[HistoryDailyRollup.pomodoro_id, HistoryDailyRollup.day],
+        set_={
+            'focus_seconds': rollup_insert.excluded.focus_seconds,
+            'intervals': rollup_insert.excluded.intervals,
+        },
+    ))
+    return result.rowcount
+
+
+if __name__ == '__main__':
+    with SessionLocal() as session:
+        written_rows = backfill_daily_rollup(session)
+        session.commit()
+    print(f'{written_rows=}')
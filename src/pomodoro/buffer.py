@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Awaitable, Callable
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError, SQLAlchemyError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from fastapi import HTTPException
+from ..database import AsyncSessionLocal
+from .constants import get_pomodoro_env, HistoryWriteMode
+from .exceptions import HTTPException503
+from .schemas import HistorySchemas
+from .utils import PomodoroAsyncCRUDDB
+
+logger = logging.getLogger(__name__)
+
+HistoryWriter = Callable[[list[HistorySchemas.Create]], Awaitable[None]]
+
+# connection exceptions, serialization failure, deadlock, too many connections
+TRANSIENT_SQLSTATE_CLASSES = ('08',)
+TRANSIENT_SQLSTATES = ('40001', '40P01', '53300')
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Errors a later retry of the same records may get past: lost connections,
+    an unreachable or overloaded database and pool checkout timeouts, as
+    opposed to records the database rejects."""
+    if isinstance(exc, (OperationalError, PoolTimeoutError, OSError)):
+        return True
+    if not isinstance(exc, DBAPIError):
+        return False
+    if exc.connection_invalidated:
+        return True
+    # psycopg2 and the asyncpg adapter both expose the SQLSTATE as pgcode
+    sqlstate = getattr(exc.orig, 'pgcode', None) or ''
+    return sqlstate.startswith(TRANSIENT_SQLSTATE_CLASSES) or sqlstate in TRANSIENT_SQLSTATES
+
+
+class HistoryWriteBuffer:
+    """Write-behind buffer for completed intervals.
+
+    Records are acknowledged once they are in memory and stored by a single
+    background task every `flush_interval_in_ms` or as soon as `flush_size`
+    records are waiting, whichever comes first. Records still in memory are
+    lost if the process dies; `stop` drains them on a graceful shutdown.
+    """
+
+    def __init__(self,
+                 flush_interval_in_ms: int,
+                 flush_size: int,
+                 max_size: int,
+                 writer: HistoryWriter) -> None:
+        self.flush_interval_in_ms = flush_interval_in_ms
+        self.flush_size = flush_size
+        self.max_size = max_size
+        self._writer = writer
+        self._pending: list[HistorySchemas.Create] = []
+        self._flush_needed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._is_stopping = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def put(self, history_shcemes: list[HistorySchemas.Create]) -> None:
+        if len(self._pending) + len(history_shcemes) > self.max_size:
+            raise HTTPException503
+        # stamped now, a flush delayed by an outage would stamp them later
+        utc_now = datetime.utcnow()
+        self._pending.extend(
+            history_shceme if history_shceme.utc_end is not None
+            else history_shceme.copy(update={'utc_end': utc_now})
+            for history_shceme in history_shcemes)
+        if len(self._pending) >= self.flush_size:
+            self._flush_needed.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._is_stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            self._is_stopping = True
+            self._flush_needed.set()
+            await task
+        await self.flush()
+        if self._pending:
+            logger.error('Lost %d history records on shutdown', len(self._pending))
+
+    async def flush(self) -> None:
+        """Writes pending records in batches of `flush_size`.
+
+        Transient errors keep the records at the front of the queue for the
+        next flush. A batch the database rejects is halved until the bad
+        records are isolated, so only those are dropped.
+        """
+        while self._pending:
+            batch = self._pending[:self.flush_size]
+            del self._pending[:self.flush_size]
+            # stack of parts left to write, the next one on top
+            parts = [batch]
+            while parts:
+                part = parts.pop()
+                try:
+                    await self._writer(part)
+                except (HTTPException, SQLAlchemyError, OSError) as exc:
+                    if is_transient_error(exc):
+                        logger.exception('Failed to store %d history records, will retry',
+                                         len(part) + sum(map(len, parts)))
+                        self._requeue([part, *reversed(parts)])
+                        return
+                    if len(part) > 1:
+                        middle = len(part) // 2
+                        parts += [part[middle:], part[:middle]]
+                        continue
+                    logger.error('Dropped a history record of user %d: %s',
+                                 part[0].user_id, getattr(exc, 'detail', exc))
+                except asyncio.CancelledError:
+                    self._requeue([part, *reversed(parts)])
+                    raise
+
+    def _requeue(self, parts: list[list[HistorySchemas.Create]]) -> None:
+        self._pending[:0] = [record for part in parts for record in part]
+
+    async def _run(self) -> None:
+        while not self._is_stopping:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(),
+                                       self.flush_interval_in_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            await self.flush()
+
+
+async def write_history_to_db(history_shcemes: list[HistorySchemas.Create]) -> None:
+    async with AsyncSessionLocal() as session:
+        if not get_pomodoro_env().HISTORY_SYNCHRONOUS_COMMIT:
+            # commit returns before the WAL is flushed to disk
+            await session.execute(text('SET LOCAL synchronous_commit TO OFF'))
+        crud = PomodoroAsyncCRUDDB(session)
+        await crud.create_pomodoro_histories(history_shcemes)
+        await session.commit()
+
+
+async def record_history(history_shcemes: list[HistorySchemas.Create]) -> None:
+    """Stores intervals through the buffer when it runs, with a commit of their own otherwise."""
+    history_buffer = get_history_buffer()
+    if history_buffer.is_running:
+        await history_buffer.put(history_shcemes)
+        return
+    async with AsyncSessionLocal() as session:
+        crud = PomodoroAsyncCRUDDB(session)
+        await crud.create_pomodoro_histories(history_shcemes)
+        await session.commit()
+
+
+@lru_cache
+def get_history_buffer() -> HistoryWriteBuffer:
+    pomodoro_env = get_pomodoro_env()
+    return HistoryWriteBuffer(
+        flush_interval_in_ms=pomodoro_env.HISTORY_FLUSH_INTERVAL_IN_MS,
+        flush_size=pomodoro_env.HISTORY_FLUSH_SIZE,
+        max_size=pomodoro_env.HISTORY_BUFFER_MAX_SIZE,
+        writer=write_history_to_db,
+    )
+
+
+def __getattr__(name: str):
+    if name == 'history_buffer':
+        return get_history_buffer()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+async def start_history_buffer() -> None:
+    if get_pomodoro_env().HISTORY_WRITE_MODE == HistoryWriteMode.buffered:
+        get_history_buffer().start()
+
+
+async def stop_history_buffer() -> None:
+    await get_history_buffer().stop()
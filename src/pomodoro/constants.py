@@ -1,3 +1,34 @@
+from enum import Enum
+from functools import lru_cache
+from pydantic import BaseSettings
+
+
+class HistoryWriteMode(str, Enum):
+    direct = 'direct'
+    buffered = 'buffered'
+
+
+class PomodoroEnv(BaseSettings):
+    class Config:
+        env_file = '.env'
+    HISTORY_WRITE_MODE: HistoryWriteMode = HistoryWriteMode.direct
+    HISTORY_FLUSH_INTERVAL_IN_MS: int = 200
+    HISTORY_FLUSH_SIZE: int = 1000
+    HISTORY_BUFFER_MAX_SIZE: int = 100_000
+    HISTORY_SYNCHRONOUS_COMMIT: bool = True
+    TIMER_TICK_IN_MS: int = 1000
+
+
+@lru_cache
+def get_pomodoro_env() -> PomodoroEnv:
+    return PomodoroEnv()
+
+
+def __getattr__(name: str):
+    if name == 'pomodoro_env':
+        return get_pomodoro_env()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 MAX_LONG_DURATION = 99
 STARNDART_LONG_R_DURATION = 15
 MIN_LONG_DURATION = 1
@@ -13,3 +44,21 @@ MIN_WORK_DURATION = 1
 MIN_SESSIONS = 1
 STANDART_SESSIONS = 4
 MAX_SESSIONS = 10
+
+MAX_HISTORY_BATCH_SIZE = 1000
+
+MIN_HISTORY_PAGE_SIZE = 1
+STANDART_HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+
+MAX_STATISTICS_RANGE_IN_DAYS = 366
+STANDART_STATISTICS_RANGE_IN_DAYS = 30
+
+SETTINGS_CACHE_SIZE = 4096
+# a PUT only invalidates the cache of the worker serving it, other workers
+# keep serving the old settings and matching their ETag for up to the TTL
+SETTINGS_CACHE_TTL_IN_SECONDS = 5
+
+# distinct settings tuples with a memoized phase sequence
+SCHEDULE_CACHE_SIZE = 4096
+MAX_SCHEDULE_BATCH_SIZE = 1000
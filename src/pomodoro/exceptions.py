@@ -6,3 +6,6 @@ HTTPException400 = HTTPException(
 HTTPException409 = HTTPException(
     status_code=status.HTTP_406_NOT_ACCEPTABLE, detail='can\'t create becouse invalid ID'
 )
+HTTPException503 = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail='History buffer is full, try again later'
+)
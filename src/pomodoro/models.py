@@ -1,5 +1,4 @@
-from sqlalchemy import (Boolean, Column, Integer, String, ForeignKey, DateTime)
-from datetime import datetime
+from sqlalchemy import (Boolean, Column, Integer, BigInteger, String, ForeignKey, Date, DateTime, Index, func)
 from ..database import Base
 from .constants import (
     STANDART_SHORT_R_DURATION,
@@ -8,6 +7,9 @@ from .constants import (
     STARNDART_LONG_R_DURATION
 )
 
+UTC_NOW = func.timezone('utc', func.now())
+
+
 class Pomodoro(Base):
     __tablename__ = 'pomodoro'
     __table_args__ = {'extend_existing': True}
@@ -27,10 +29,15 @@ class Pomodoro(Base):
 
 class PomodoroHistory(Base):
     __tablename__ = 'history_of_pomodoro'
-    __table_args__ = {'extend_existing': True} 
+    __table_args__ = (
+        Index('ix_history_of_pomodoro_pomodoro_id_utc_end_id',
+              'pomodoro_id', 'utc_end', 'id',
+              postgresql_include=['duration_in_seconds']),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    utc_end = Column(DateTime, nullable=False, default=datetime.utcnow())
+    utc_end = Column(DateTime, nullable=False, server_default=UTC_NOW)
     duration_in_seconds = Column(Integer, nullable=False)
 
     pomodoro_id = Column(
@@ -38,5 +45,18 @@ class PomodoroHistory(Base):
         ForeignKey('pomodoro.id', ondelete='CASCADE'),
         nullable=False,
         index=True,
-        unique=True
-    )
\ No newline at end of file
+    )
+
+
+class HistoryDailyRollup(Base):
+    __tablename__ = 'history_daily_rollup'
+    __table_args__ = {'extend_existing': True}
+
+    pomodoro_id = Column(
+        Integer,
+        ForeignKey('pomodoro.id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+    day = Column(Date, primary_key=True)
+    focus_seconds = Column(BigInteger, nullable=False, default=0)
+    intervals = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,58 @@
+from enum import Enum
+from functools import lru_cache
+from typing import NamedTuple
+from .constants import SCHEDULE_CACHE_SIZE
+
+
+class Phase(str, Enum):
+    work = 'work'
+    short_rest = 'short_rest'
+    long_rest = 'long_rest'
+
+
+class PhaseSpan(NamedTuple):
+    phase: Phase
+    # 1-based number of the work session the phase belongs to
+    session: int
+    duration_in_seconds: int
+
+
+class ScheduledPhase(NamedTuple):
+    phase: Phase
+    session: int
+    start_offset_in_seconds: int
+    end_offset_in_seconds: int
+
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def build_phase_sequence(work_duration: int,
+                         short_rest_duration: int,
+                         long_rest_duration: int,
+                         number_of_sessions: int) -> tuple[PhaseSpan, ...]:
+    """Phases of one pomodoro cycle from settings in minutes: work sessions
+    separated by short rests, the last one followed by a long rest."""
+    phases = []
+    for session in range(1, number_of_sessions + 1):
+        phases.append(PhaseSpan(Phase.work, session, work_duration * 60))
+        if session < number_of_sessions:
+            phases.append(PhaseSpan(Phase.short_rest, session, short_rest_duration * 60))
+        else:
+            phases.append(PhaseSpan(Phase.long_rest, session, long_rest_duration * 60))
+    return tuple(phases)
+
+
+@lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def get_phase_offsets(work_duration: int,
+                      short_rest_duration: int,
+                      long_rest_duration: int,
+                      number_of_sessions: int) -> tuple[ScheduledPhase, ...]:
+    """Phase boundaries in seconds from the start of the cycle. Like the
+    sequence it is memoized on the settings tuple: few distinct tuples are in
+    use at once, although the MIN_ and MAX_ constants allow millions."""
+    offsets = []
+    start = 0
+    for phase, session, duration_in_seconds in build_phase_sequence(
+            work_duration, short_rest_duration, long_rest_duration, number_of_sessions):
+        offsets.append(ScheduledPhase(phase, session, start, start + duration_in_seconds))
+        start += duration_in_seconds
+    return tuple(offsets)
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+from fastapi import (APIRouter, Depends, Header, HTTPException, Query, Response,
+                     WebSocket, WebSocketDisconnect, status)
+from pydantic import ValidationError
+from ..auth.dependencies import get_current_user, get_current_user_if_active, get_current_superuser
+from ..auth.schemas import UserSchemas
+from ..database import AsyncSessionLocal
+from ..responses import ModelResponse
+from .schemas import (PomodoroSchemas, HistorySchemas, StatisticsSchemas, TimerSchemas,
+                      ScheduleSchemas, to_naive_utc)
+from .constants import (
+    STANDART_STATISTICS_RANGE_IN_DAYS,
+    MIN_HISTORY_PAGE_SIZE,
+    STANDART_HISTORY_PAGE_SIZE,
+    MAX_HISTORY_PAGE_SIZE,
+)
+from .buffer import get_history_buffer
+from .timer import get_timer_service
+from .utils import (
+    PomodoroAsyncCRUDDB,
+    HistoryStatisticsAsyncDB,
+    settings_cache,
+    get_settings_etag,
+    is_etag_matched,
+    build_schedule,
+    build_schedule_groups,
+)
+pomodoro_router = APIRouter(prefix='/pomodoro', tags=['POMODORO'])
+
+
+async def get_cached_settings(user_id: int) -> PomodoroSchemas.ReadCreate:
+    settings = settings_cache.get(user_id)
+    if settings is None:
+        async with AsyncSessionLocal() as session:
+            crud = PomodoroAsyncCRUDDB(session)
+            settings = await crud.get_pomodoro_settings_by(user_id=user_id)
+            await session.commit()
+        settings_cache.set(user_id, settings)
+    return settings
+
+
+@pomodoro_router.get('/settings', response_model=PomodoroSchemas.ReadCreate)
+async def get_settings(if_none_match: str | None = Header(default=None),
+                       user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    settings = await get_cached_settings(user.id)
+    etag = get_settings_etag(settings)
+    if is_etag_matched(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return ModelResponse(settings, headers={'ETag': etag})
+
+
+@pomodoro_router.put('/settings', response_model=PomodoroSchemas.ReadCreate)
+async def update_settings(new_settings: PomodoroSchemas.Settings,
+                          user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    pomodoro_scheme = PomodoroSchemas.Update(user_id=user.id, **new_settings.dict())
+    async with AsyncSessionLocal() as session:
+        crud = PomodoroAsyncCRUDDB(session)
+        await crud.save_pomodoro_settings(pomodoro_scheme)
+        settings = await crud.get_pomodoro_settings_by(user_id=user.id)
+        await session.commit()
+    settings_cache.set(user.id, settings)
+    return ModelResponse(settings, headers={'ETag': get_settings_etag(settings)})
+
+
+@pomodoro_router.post('/history',
+                      response_model=HistorySchemas.BatchResult,
+                      status_code=status.HTTP_201_CREATED)
+async def create_history(batch: HistorySchemas.CreateBatch,
+                         user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    history_buffer = get_history_buffer()
+    if history_buffer.is_running:
+        await history_buffer.put([
+            HistorySchemas.Create(user_id=user.id, **interval.dict())
+            for interval in batch.intervals
+        ])
+        return ModelResponse(
+            HistorySchemas.BatchResult(created=len(batch.intervals), is_buffered=True),
+            status_code=status.HTTP_202_ACCEPTED)
+    async with AsyncSessionLocal() as session:
+        crud = PomodoroAsyncCRUDDB(session)
+        created = await crud.create_pomodoro_history_batch(user.id, batch.intervals)
+        await session.commit()
+    return ModelResponse(HistorySchemas.BatchResult(created=created),
+                         status_code=status.HTTP_201_CREATED)
+
+
+@pomodoro_router.get('/history', response_model=HistorySchemas.Page)
+async def get_history(cursor: str | None = None,
+                      page_size: int = Query(default=STANDART_HISTORY_PAGE_SIZE,
+                                             ge=MIN_HISTORY_PAGE_SIZE,
+                                             le=MAX_HISTORY_PAGE_SIZE),
+                      user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    async with AsyncSessionLocal() as session:
+        crud = PomodoroAsyncCRUDDB(session)
+        page = await crud.get_pomodoro_history_page(user.id, page_size, cursor)
+    return ModelResponse(page)
+
+
+@pomodoro_router.get('/statistics', response_model=list[StatisticsSchemas.Bucket])
+async def get_statistics(period: StatisticsSchemas.Period = StatisticsSchemas.Period.day,
+                         utc_start: datetime | None = None,
+                         utc_end: datetime | None = None,
+                         user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    utc_end = to_naive_utc(utc_end) or datetime.utcnow()
+    utc_start = to_naive_utc(utc_start) or utc_end - timedelta(
+        days=STANDART_STATISTICS_RANGE_IN_DAYS)
+    async with AsyncSessionLocal() as session:
+        statistics = HistoryStatisticsAsyncDB(session)
+        buckets = await statistics.get_focus_statistics(
+            user.id, period, utc_start, utc_end)
+    return ModelResponse(buckets)
+
+
+@pomodoro_router.get('/schedule', response_model=ScheduleSchemas.Schedule)
+async def get_schedule(utc_start: datetime | None = None,
+                       user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    settings = await get_cached_settings(user.id)
+    return ModelResponse(build_schedule(settings, to_naive_utc(utc_start) or datetime.utcnow()))
+
+
+@pomodoro_router.post('/schedule', response_model=ScheduleSchemas.Schedule)
+async def compute_schedule(compute: ScheduleSchemas.Compute,
+                           user: UserSchemas.Get = Depends(get_current_user_if_active)):
+    return ModelResponse(build_schedule(compute.settings, compute.utc_start or datetime.utcnow()))
+
+
+@pomodoro_router.post('/schedule/batch', response_model=list[ScheduleSchemas.Group],
+                      dependencies=[Depends(get_current_superuser)])
+async def get_schedules(batch: ScheduleSchemas.BatchRequest):
+    async with AsyncSessionLocal() as session:
+        crud = PomodoroAsyncCRUDDB(session)
+        settings_by_user_id = await crud.get_pomodoro_settings_by_user_ids(batch.user_ids)
+    return ModelResponse(build_schedule_groups(settings_by_user_id,
+                                               batch.utc_start or datetime.utcnow()))
+
+
+@pomodoro_router.websocket('/timer')
+async def run_timer(websocket: WebSocket, token: str = Query()):
+    """Live timer of the user's settings. Clients send `{"action": ...}` commands
+    and receive the timer status after each command and phase change."""
+    try:
+        user = await get_current_user_if_active(await get_current_user(token))
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    settings = await get_cached_settings(user.id)
+
+    async def send_status(timer_status: TimerSchemas.Status) -> None:
+        await websocket.send_json(timer_status.dict())
+
+    timer_service = get_timer_service()
+    timer_service.start()
+    timer_session = timer_service.create_session(user.id, settings, send_status)
+    try:
+        while True:
+            try:
+                command = TimerSchemas.Command.parse_raw(await websocket.receive_text())
+            except ValidationError as exc:
+                await websocket.send_json({'detail': exc.errors()})
+                continue
+            timer_session.apply(command.action)
+            await send_status(timer_session.get_status())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        timer_session.close()
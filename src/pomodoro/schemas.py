@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+from enum import Enum
+from pydantic import BaseModel, Field, validator
 from .constants import (
     MAX_LONG_DURATION,
     MIN_LONG_DURATION,
@@ -12,11 +14,21 @@ from .constants import (
     MAX_SESSIONS,
     MIN_SESSIONS,
     STANDART_SESSIONS,
+    MAX_HISTORY_BATCH_SIZE,
+    MAX_SCHEDULE_BATCH_SIZE,
 )
+from .phases import Phase
 long_rest_dur = Field(ge=MIN_LONG_DURATION, le=MAX_LONG_DURATION, default=STARNDART_LONG_R_DURATION)
 short_rest_dur = Field(ge=MIN_SHORT_DURATION, le=MAX_SHORT_DURATION, default=STANDART_SHORT_R_DURATION)
 work_duration = Field(ge=MIN_WORK_DURATION, le=MAX_WORK_DURATION, default=STANDART_WORK_DURATION)
 numb_of_sessions = Field(ge=MIN_SESSIONS, le=MAX_SESSIONS, default=STANDART_SESSIONS)
+interval_duration = Field(gt=0, le=MAX_WORK_DURATION * 60)
+
+
+def to_naive_utc(value: datetime | None) -> datetime | None:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 class PomodoroSchemas:
@@ -31,6 +43,12 @@ class PomodoroSchemas:
     class Delete(BaseModel):
         id: int
 
+    class Settings(BaseModel):
+        short_rest_duration: int = short_rest_dur
+        long_rest_duration: int = long_rest_dur
+        work_duration: int = work_duration
+        number_of_sessions: int = numb_of_sessions
+
     class Update(BaseModel):
         user_id: int
         short_rest_duration: int = short_rest_dur
@@ -38,8 +56,111 @@ class PomodoroSchemas:
         work_duration: int = work_duration
         number_of_sessions: int = numb_of_sessions
 
+class HistoryInterval(BaseModel):
+    duration_in_seconds: int = interval_duration
+    utc_end: datetime | None = None
+
+    _utc_end_to_naive_utc = validator('utc_end', allow_reuse=True)(to_naive_utc)
+
+
+class HistoryRead(BaseModel):
+    id: int
+    utc_end: datetime
+    duration_in_seconds: int
+
+
 class HistorySchemas:
-    class Create(BaseModel):
+    Interval = HistoryInterval
+    Read = HistoryRead
+
+    class Create(HistoryInterval):
         user_id: int
-        duration_in_seconds: int
-        
\ No newline at end of file
+
+    class CreateBatch(BaseModel):
+        intervals: list[HistoryInterval] = Field(
+            min_items=1, max_items=MAX_HISTORY_BATCH_SIZE)
+
+    class BatchResult(BaseModel):
+        created: int
+        is_buffered: bool = False
+
+    class Page(BaseModel):
+        items: list[HistoryRead]
+        next_cursor: str | None = None
+
+
+class StatisticsSchemas:
+    class Period(str, Enum):
+        day = 'day'
+        week = 'week'
+        month = 'month'
+
+    class Bucket(BaseModel):
+        utc_start: datetime
+        focus_seconds: int
+        intervals: int
+
+
+class TimerAction(str, Enum):
+    start = 'start'
+    pause = 'pause'
+    resume = 'resume'
+    stop = 'stop'
+
+
+class TimerState(str, Enum):
+    idle = 'idle'
+    running = 'running'
+    paused = 'paused'
+    completed = 'completed'
+    stopped = 'stopped'
+
+
+class TimerSchemas:
+    Action = TimerAction
+    State = TimerState
+
+    class Command(BaseModel):
+        action: TimerAction
+
+    class Status(BaseModel):
+        state: TimerState
+        phase: Phase | None = None
+        session: int | None = None
+        remaining_in_seconds: float = 0
+
+
+class SchedulePhase(BaseModel):
+    phase: Phase
+    session: int
+    utc_start: datetime
+    utc_end: datetime
+
+
+class PomodoroSchedule(BaseModel):
+    utc_start: datetime
+    utc_end: datetime
+    phases: list[SchedulePhase]
+
+
+class ScheduleSchemas:
+    Phase = SchedulePhase
+    Schedule = PomodoroSchedule
+
+    class Compute(BaseModel):
+        settings: PomodoroSchemas.Settings = PomodoroSchemas.Settings()
+        utc_start: datetime | None = None
+
+        _utc_start_to_naive_utc = validator('utc_start', allow_reuse=True)(to_naive_utc)
+
+    class BatchRequest(BaseModel):
+        user_ids: list[int] = Field(min_items=1, max_items=MAX_SCHEDULE_BATCH_SIZE)
+        utc_start: datetime | None = None
+
+        _utc_start_to_naive_utc = validator('utc_start', allow_reuse=True)(to_naive_utc)
+
+    class Group(BaseModel):
+        # users sharing the settings and so the schedule
+        user_ids: list[int]
+        settings: PomodoroSchemas.Settings
+        schedule: PomodoroSchedule
@@ -0,0 +1,143 @@
+"""Live pomodoro timers.
+
+Sessions of a process share one `TimingWheel`: a running session owns a single
+wheel timer for the end of its current phase, so there is no task or sleep per
+client. Phase changes are pushed through the session's `on_change` callback and
+every completed work phase is recorded as a history interval.
+"""
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Awaitable, Callable, Coroutine
+from .buffer import record_history
+from .constants import get_pomodoro_env
+from .phases import Phase, PhaseSpan, build_phase_sequence
+from .schemas import PomodoroSchemas, HistorySchemas, TimerSchemas
+from .wheel import Timer, TimingWheel
+
+logger = logging.getLogger(__name__)
+
+HistoryRecorder = Callable[[list[HistorySchemas.Create]], Awaitable[None]]
+StatusListener = Callable[[TimerSchemas.Status], Awaitable[None]]
+
+
+class TimerSession:
+    __slots__ = ('user_id', 'phases', 'phase_index', 'state', 'remaining_in_seconds',
+                 '_service', '_on_change', '_timer')
+
+    def __init__(self, service: 'TimerService', user_id: int,
+                 phases: tuple[PhaseSpan, ...], on_change: StatusListener) -> None:
+        self.user_id = user_id
+        self.phases = phases
+        self.phase_index = 0
+        self.state = TimerSchemas.State.idle
+        self.remaining_in_seconds = float(phases[0].duration_in_seconds)
+        self._service = service
+        self._on_change = on_change
+        self._timer: Timer | None = None
+
+    def get_status(self) -> TimerSchemas.Status:
+        if self.state in (TimerSchemas.State.completed, TimerSchemas.State.stopped):
+            return TimerSchemas.Status(state=self.state)
+        phase = self.phases[self.phase_index]
+        remaining_in_seconds = self.remaining_in_seconds
+        if self._timer is not None:
+            remaining_in_seconds = self._service.wheel.get_remaining_seconds(self._timer)
+        return TimerSchemas.Status(state=self.state, phase=phase.phase,
+                                   session=phase.session,
+                                   remaining_in_seconds=remaining_in_seconds)
+
+    def apply(self, action: TimerSchemas.Action) -> bool:
+        """Performs `action`, returns False when the current state doesn't allow it."""
+        State = TimerSchemas.State
+        if action == TimerSchemas.Action.start and self.state not in (State.running, State.paused):
+            self.phase_index = 0
+            self._run(self.phases[0].duration_in_seconds)
+        elif action == TimerSchemas.Action.pause and self.state == State.running:
+            self.remaining_in_seconds = self._service.wheel.get_remaining_seconds(self._timer)
+            self._cancel_timer()
+            self.state = State.paused
+        elif action == TimerSchemas.Action.resume and self.state == State.paused:
+            self._run(self.remaining_in_seconds)
+        elif action == TimerSchemas.Action.stop and self.state in (State.running, State.paused):
+            self._cancel_timer()
+            self.state = State.stopped
+        else:
+            return False
+        return True
+
+    def close(self) -> None:
+        self._cancel_timer()
+
+    def _run(self, duration_in_seconds: float) -> None:
+        self.state = TimerSchemas.State.running
+        self.remaining_in_seconds = duration_in_seconds
+        self._timer = self._service.wheel.call_later(duration_in_seconds, self._on_phase_end)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_phase_end(self) -> None:
+        self._timer = None
+        finished = self.phases[self.phase_index]
+        if finished.phase == Phase.work:
+            self._service.spawn(self._service.record_history([HistorySchemas.Create(
+                user_id=self.user_id, duration_in_seconds=finished.duration_in_seconds)]))
+        self.phase_index += 1
+        if self.phase_index == len(self.phases):
+            self.phase_index = 0
+            self.state = TimerSchemas.State.completed
+        else:
+            self._run(self.phases[self.phase_index].duration_in_seconds)
+        self._service.spawn(self._on_change(self.get_status()))
+
+
+class TimerService:
+    def __init__(self, wheel: TimingWheel, record_history: HistoryRecorder) -> None:
+        self.wheel = wheel
+        self.record_history = record_history
+        self._tasks: set[asyncio.Task] = set()
+
+    def create_session(self, user_id: int, settings: PomodoroSchemas.Settings,
+                       on_change: StatusListener) -> TimerSession:
+        phases = build_phase_sequence(settings.work_duration,
+                                      settings.short_rest_duration,
+                                      settings.long_rest_duration,
+                                      settings.number_of_sessions)
+        return TimerSession(self, user_id, phases, on_change)
+
+    def spawn(self, coroutine: Coroutine) -> None:
+        """Runs a notification or a history write in the background, logging failures."""
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error('Timer task failed', exc_info=task.exception())
+
+    def start(self) -> None:
+        self.wheel.start()
+
+    async def stop(self) -> None:
+        await self.wheel.stop()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+@lru_cache
+def get_timer_service() -> TimerService:
+    pomodoro_env = get_pomodoro_env()
+    return TimerService(TimingWheel(tick_in_seconds=pomodoro_env.TIMER_TICK_IN_MS / 1000),
+                        record_history=record_history)
+
+
+async def start_timer_service() -> None:
+    get_timer_service().start()
+
+
+async def stop_timer_service() -> None:
+    await get_timer_service().stop()
@@ -1,10 +1,128 @@
-from .schemas import PomodoroSchemas, HistorySchemas
-from .models import Pomodoro, PomodoroHistory
+from .schemas import PomodoroSchemas, HistorySchemas, StatisticsSchemas, ScheduleSchemas
+from .phases import get_phase_offsets
+from .models import Pomodoro, PomodoroHistory, HistoryDailyRollup, UTC_NOW
 from .exceptions import HTTPException400, HTTPException409
+from .constants import (
+    SETTINGS_CACHE_SIZE,
+    SETTINGS_CACHE_TTL_IN_SECONDS,
+    MAX_STATISTICS_RANGE_IN_DAYS,
+)
 from ..database import Base
+from ..cache import TTLCache
+from ..monitoring.metrics import timed_methods, db_crud_duration_seconds
 from abc import ABC, abstractmethod
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime, timedelta
+from hashlib import sha1
+from sqlalchemy import select, insert, func, literal_column, cast, tuple_, Date, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import DataError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import DataError, IntegrityError
+
+settings_cache = TTLCache(
+    maxsize=SETTINGS_CACHE_SIZE,
+    ttl_in_seconds=SETTINGS_CACHE_TTL_IN_SECONDS,
+)
+
+
+def get_settings_etag(settings: PomodoroSchemas.ReadCreate) -> str:
+    return f'"{sha1(settings.json().encode()).hexdigest()}"'
+
+
+def is_etag_matched(etag: str, if_none_match: str | None) -> bool:
+    if if_none_match is None:
+        return False
+    candidates = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag in candidates or '*' in candidates
+
+
+SETTINGS_KEY_FIELDS = ('work_duration', 'short_rest_duration',
+                       'long_rest_duration', 'number_of_sessions')
+
+
+def get_settings_key(settings: PomodoroSchemas.Settings) -> tuple[int, int, int, int]:
+    return tuple(getattr(settings, field) for field in SETTINGS_KEY_FIELDS)
+
+
+def build_schedule(settings: PomodoroSchemas.Settings,
+                   utc_start: datetime) -> ScheduleSchemas.Schedule:
+    phases = [
+        ScheduleSchemas.Phase.construct(
+            phase=phase, session=session,
+            utc_start=utc_start + timedelta(seconds=start_offset),
+            utc_end=utc_start + timedelta(seconds=end_offset))
+        for phase, session, start_offset, end_offset
+        in get_phase_offsets(*get_settings_key(settings))
+    ]
+    return ScheduleSchemas.Schedule.construct(
+        utc_start=utc_start, utc_end=phases[-1].utc_end, phases=phases)
+
+
+def build_schedule_groups(settings_by_user_id: dict[int, PomodoroSchemas.Settings],
+                          utc_start: datetime) -> list[ScheduleSchemas.Group]:
+    """Schedules of many users, built once per distinct settings tuple."""
+    user_ids_by_key: dict[tuple, list[int]] = {}
+    for user_id, settings in settings_by_user_id.items():
+        user_ids_by_key.setdefault(get_settings_key(settings), []).append(user_id)
+    groups = []
+    for key, user_ids in user_ids_by_key.items():
+        settings = PomodoroSchemas.Settings.construct(**dict(zip(SETTINGS_KEY_FIELDS, key)))
+        groups.append(ScheduleSchemas.Group.construct(
+            user_ids=user_ids, settings=settings, schedule=build_schedule(settings, utc_start)))
+    return groups
+
+
+def build_history_insert(intervals: list[tuple[int, HistorySchemas.Interval]]):
+    """Single statement that inserts `(pomodoro_id, interval)` pairs into
+    `history_of_pomodoro` and adds them to `history_daily_rollup`, so both
+    stay in one transaction.
+    """
+    rows = [
+        {
+            'pomodoro_id': pomodoro_id,
+            'duration_in_seconds': interval.duration_in_seconds,
+            'utc_end': UTC_NOW if interval.utc_end is None else interval.utc_end,
+        }
+        for pomodoro_id, interval in intervals
+    ]
+    inserted = (
+        insert(PomodoroHistory)
+        .values(rows)
+        .returning(PomodoroHistory.pomodoro_id,
+                   PomodoroHistory.utc_end,
+                   PomodoroHistory.duration_in_seconds)
+        .cte('inserted_history')
+    )
+    day = cast(inserted.c.utc_end, Date)
+    rollup_insert = pg_insert(HistoryDailyRollup).from_select(
+        ['pomodoro_id', 'day', 'focus_seconds', 'intervals'],
+        select(inserted.c.pomodoro_id,
+               day,
+               func.sum(inserted.c.duration_in_seconds),
+               func.count())
+        .group_by(inserted.c.pomodoro_id, day)
+    )
+    return rollup_insert.on_conflict_do_update(
+        index_elements=[HistoryDailyRollup.pomodoro_id, HistoryDailyRollup.day],
+        set_={
+            'focus_seconds': HistoryDailyRollup.focus_seconds + rollup_insert.excluded.focus_seconds,
+            'intervals': HistoryDailyRollup.intervals + rollup_insert.excluded.intervals,
+        },
+    ).add_cte(inserted)
+
+
+def encode_history_cursor(utc_end: datetime, id_: int) -> str:
+    return urlsafe_b64encode(f'{utc_end.isoformat()}|{id_}'.encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        utc_end, id_ = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(utc_end), int(id_)
+    except (BinasciiError, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException400 from exc
 
 
 class PomodoroCRUDAbstract(ABC):
@@ -29,7 +147,20 @@ class PomodoroCRUDAbstract(ABC):
     def create_pomodoro_history(self, history_shceme: HistorySchemas.Create) -> None:
         pass
 
+    @abstractmethod
+    def create_pomodoro_history_batch(self,
+                                      user_id: int,
+                                      intervals: list[HistorySchemas.Interval]
+                                      ) -> int:
+        """Stores all `intervals` of the user with one INSERT statement.
+
+        Returns:
+            int: number of stored intervals.
+        """
+        pass
 
+
+@timed_methods(db_crud_duration_seconds)
 class PomodoroCRUDDB(PomodoroCRUDAbstract):
 
     def __init__(self, session: Session):
@@ -99,5 +230,262 @@ class PomodoroCRUDDB(PomodoroCRUDAbstract):
         return db_instance
 
     def create_pomodoro_history(self, history_shceme: HistorySchemas.Create) -> None:
-        db_record = PomodoroHistory(**history_shceme.dict())
-        
\ No newline at end of file
+        self.create_pomodoro_history_batch(history_shceme.user_id, [history_shceme])
+
+    def create_pomodoro_history_batch(self,
+                                      user_id: int,
+                                      intervals: list[HistorySchemas.Interval]
+                                      ) -> int:
+        pomodoro_from_db = self._get_pomodoro_by_user_id(user_id)
+        statement = build_history_insert(
+            [(pomodoro_from_db.id, interval) for interval in intervals])
+        try:
+            self.session.execute(statement)
+        except DataError as exc:
+            raise HTTPException409 from exc
+        return len(intervals)
+        
+
+
+class PomodoroCRUDAsyncAbstract(ABC):
+
+    @abstractmethod
+    async def get_pomodoro_settings_by(self,
+                                       id_: int | None = None,
+                                       user_id: int | None = None
+                                       ) -> PomodoroSchemas.ReadCreate:
+        """
+        Args:
+            id (int | None, optional): first to check and return. Defaults to None. 
+            user_id (int | None, optional): second to check and return. Defaults to None.
+        """
+        pass
+
+    @abstractmethod
+    async def save_pomodoro_settings(self, pomodoro_scheme: PomodoroSchemas.Update) -> None:
+        pass
+
+    @abstractmethod
+    async def create_pomodoro_history(self, history_shceme: HistorySchemas.Create) -> None:
+        pass
+
+    @abstractmethod
+    async def create_pomodoro_history_batch(self,
+                                            user_id: int,
+                                            intervals: list[HistorySchemas.Interval]
+                                            ) -> int:
+        """Stores all `intervals` of the user with one INSERT statement.
+
+        Returns:
+            int: number of stored intervals.
+        """
+        pass
+
+    @abstractmethod
+    async def create_pomodoro_histories(self,
+                                        history_shcemes: list[HistorySchemas.Create]
+                                        ) -> int:
+        """Stores intervals of any number of users with one INSERT statement.
+
+        Returns:
+            int: number of stored intervals.
+        """
+        pass
+
+    @abstractmethod
+    async def get_pomodoro_settings_by_user_ids(self, user_ids: list[int]
+                                                ) -> dict[int, PomodoroSchemas.Settings]:
+        """Settings of the users, the defaults for users who haven't saved any."""
+        pass
+
+    @abstractmethod
+    async def get_pomodoro_history_page(self,
+                                        user_id: int,
+                                        page_size: int,
+                                        cursor: str | None = None
+                                        ) -> HistorySchemas.Page:
+        """Newest first history of the user, paginated by `(utc_end, id)` keyset.
+
+        Args:
+            cursor (str | None, optional): `next_cursor` of the previous page. Defaults to None.
+        """
+        pass
+
+
+@timed_methods(db_crud_duration_seconds)
+class PomodoroAsyncCRUDDB(PomodoroCRUDAsyncAbstract):
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_pomodoro_settings_by(self,
+                                       id_: int | None = None,
+                                       user_id: int | None = None,
+                                       ) -> PomodoroSchemas.ReadCreate:
+        pomodoro_from_db = None
+        if id_ is not None:
+            pomodoro_from_db = await self._get_pomodoro_by_id(id_)
+        if user_id is not None and pomodoro_from_db is None:
+            pomodoro_from_db = await self._get_pomodoro_by_user_id(user_id)
+
+        if pomodoro_from_db is None:
+            raise HTTPException400
+
+        pomodoro_dict = pomodoro_from_db.__dict__
+        output_pomodor = PomodoroSchemas.ReadCreate(**pomodoro_dict)
+        return output_pomodor
+
+    async def _get_pomodoro_by_id(self, id_: int):
+        pomodoro_from_db = await self.session.get(Pomodoro, id_)
+        return pomodoro_from_db
+
+    async def _get_pomodoro_by_user_id(self, user_id: int):
+        result = await self.session.execute(
+            select(Pomodoro).where(Pomodoro.user_id == user_id))
+        pomodoro_from_db = result.scalars().first()
+        if pomodoro_from_db is None:
+            new_pomodoro_scheme = PomodoroSchemas.Update(user_id=user_id)
+            pomodoro_from_db = await self._create_new_pomodoro_from_scheme(
+                new_pomodoro_scheme)
+        return pomodoro_from_db
+
+    async def save_pomodoro_settings(self, pomodoro_scheme: PomodoroSchemas.Update) -> None:
+        pomodoro_from_db = await self._get_pomodoro_by_user_id(
+            pomodoro_scheme.user_id)
+
+        for key, value in pomodoro_scheme.dict().items():
+            if value is not None:
+                setattr(pomodoro_from_db, key, value)
+
+        await self._save_instance_in_db(pomodoro_from_db)
+
+    async def create_pomodoro_history(self, history_shceme: HistorySchemas.Create) -> None:
+        await self.create_pomodoro_history_batch(history_shceme.user_id, [history_shceme])
+
+    async def create_pomodoro_history_batch(self,
+                                            user_id: int,
+                                            intervals: list[HistorySchemas.Interval]
+                                            ) -> int:
+        pomodoro_from_db = await self._get_pomodoro_by_user_id(user_id)
+        statement = build_history_insert(
+            [(pomodoro_from_db.id, interval) for interval in intervals])
+        try:
+            await self.session.execute(statement)
+        except DataError as exc:
+            raise HTTPException409 from exc
+        return len(intervals)
+
+    async def create_pomodoro_histories(self,
+                                        history_shcemes: list[HistorySchemas.Create]
+                                        ) -> int:
+        pomodoro_ids = await self._get_pomodoro_ids_by_user_ids(
+            {history_shceme.user_id for history_shceme in history_shcemes})
+        statement = build_history_insert(
+            [(pomodoro_ids[history_shceme.user_id], history_shceme)
+             for history_shceme in history_shcemes])
+        try:
+            await self.session.execute(statement)
+        except DataError as exc:
+            raise HTTPException409 from exc
+        return len(history_shcemes)
+
+    async def get_pomodoro_settings_by_user_ids(self, user_ids: list[int]
+                                                ) -> dict[int, PomodoroSchemas.Settings]:
+        result = await self.session.execute(
+            select(Pomodoro.user_id, *(getattr(Pomodoro, field) for field in SETTINGS_KEY_FIELDS))
+            .where(Pomodoro.user_id.in_(user_ids)))
+        saved = {row.user_id: PomodoroSchemas.Settings(**row._mapping) for row in result}
+        return {user_id: saved.get(user_id) or PomodoroSchemas.Settings()
+                for user_id in user_ids}
+
+    async def _get_pomodoro_ids_by_user_ids(self, user_ids: set[int]) -> dict[int, int]:
+        result = await self.session.execute(
+            select(Pomodoro.user_id, Pomodoro.id).where(Pomodoro.user_id.in_(user_ids)))
+        pomodoro_ids = dict(result.all())
+        for user_id in user_ids - pomodoro_ids.keys():
+            pomodoro_from_db = await self._get_pomodoro_by_user_id(user_id)
+            pomodoro_ids[user_id] = pomodoro_from_db.id
+        return pomodoro_ids
+
+    async def get_pomodoro_history_page(self,
+                                        user_id: int,
+                                        page_size: int,
+                                        cursor: str | None = None
+                                        ) -> HistorySchemas.Page:
+        statement = (
+            select(PomodoroHistory.id,
+                   PomodoroHistory.utc_end,
+                   PomodoroHistory.duration_in_seconds)
+            .where(PomodoroHistory.pomodoro_id.in_(
+                select(Pomodoro.id).where(Pomodoro.user_id == user_id)))
+            .order_by(PomodoroHistory.utc_end.desc(), PomodoroHistory.id.desc())
+            .limit(page_size + 1)
+        )
+        if cursor is not None:
+            statement = statement.where(
+                tuple_(PomodoroHistory.utc_end, PomodoroHistory.id)
+                < tuple_(*decode_history_cursor(cursor)))
+        rows = (await self.session.execute(statement)).all()
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_history_cursor(rows[-1].utc_end, rows[-1].id)
+        # columns already have the schema types, construct skips validation
+        items = [HistorySchemas.Read.construct(**row._mapping) for row in rows]
+        return HistorySchemas.Page(items=items, next_cursor=next_cursor)
+
+    async def _create_new_pomodoro_from_scheme(self, pomodoro_create: PomodoroSchemas.Update) -> Pomodoro:
+        new_pomodoro_in_db = Pomodoro(**pomodoro_create.dict())
+        await self._save_instance_in_db(new_pomodoro_in_db)
+        return new_pomodoro_in_db
+
+    async def _save_instance_in_db(self, db_instance: Base) -> None:
+        self.session.add(db_instance)
+        try:
+            await self.session.flush()
+        except (DataError, IntegrityError) as exc:
+            raise HTTPException409 from exc
+
+
+@timed_methods(db_crud_duration_seconds)
+class HistoryStatisticsAsyncDB:
+    """Focus totals read from `history_daily_rollup`, one compact row per period.
+
+    Ranges are widened to the whole UTC days they touch, so a read costs
+    O(days) no matter how many intervals were recorded.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_focus_statistics(self,
+                                   user_id: int,
+                                   period: StatisticsSchemas.Period,
+                                   utc_start: datetime,
+                                   utc_end: datetime,
+                                   ) -> list[StatisticsSchemas.Bucket]:
+        if not utc_start < utc_end <= utc_start + timedelta(days=MAX_STATISTICS_RANGE_IN_DAYS):
+            raise HTTPException400
+
+        # period is inlined, a bound parameter would differ between SELECT and GROUP BY.
+        # A date would pick the timestamptz overload, bucketed in the session TimeZone
+        bucket = func.date_trunc(
+            literal_column(f"'{period.value}'"), cast(HistoryDailyRollup.day, DateTime))
+        statement = (
+            select(bucket,
+                   func.sum(HistoryDailyRollup.focus_seconds),
+                   func.sum(HistoryDailyRollup.intervals))
+            .where(HistoryDailyRollup.pomodoro_id.in_(
+                       select(Pomodoro.id).where(Pomodoro.user_id == user_id)),
+                   HistoryDailyRollup.day >= utc_start.date(),
+                   HistoryDailyRollup.day <= utc_end.date())
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        result = await self.session.execute(statement)
+        return [
+            StatisticsSchemas.Bucket(
+                utc_start=bucket_start, focus_seconds=focus_seconds, intervals=intervals)
+            for bucket_start, focus_seconds, intervals in result
+        ]
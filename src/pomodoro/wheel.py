@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from math import ceil
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    __slots__ = ('deadline', 'callback', 'is_cancelled')
+
+    def __init__(self, deadline: int, callback: Callable[[], None]) -> None:
+        # in ticks of the wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.is_cancelled = False
+
+    def cancel(self) -> None:
+        self.is_cancelled = True
+
+
+class TimingWheel:
+    """Hierarchical timing wheel for many long timers, driven by a single task.
+
+    Level 0 has a slot per tick, every next level a slot per whole rotation of
+    the level below. A timer sits in the lowest level whose current rotation
+    contains its deadline and moves down a level when the rotation reaches its
+    slot, so scheduling, cancelling and firing are O(1) whatever the number of
+    timers. Cancelled timers are dropped when their slot is reached.
+    """
+
+    def __init__(self, tick_in_seconds: float = 1.0,
+                 slot_bits: int = 6, levels: int = 4) -> None:
+        self.tick_in_seconds = tick_in_seconds
+        self.slot_bits = slot_bits
+        self.levels = levels
+        self._slot_mask = (1 << slot_bits) - 1
+        self._wheels: list[list[list[Timer]]] = [
+            [[] for _ in range(1 << slot_bits)] for _ in range(levels)]
+        # timers beyond the top level's rotation
+        self._overflow: list[Timer] = []
+        self._tick = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    def call_later(self, delay_in_seconds: float, callback: Callable[[], None]) -> Timer:
+        """Calls `callback` after at least `delay_in_seconds`, rounded up to a tick."""
+        ticks = max(1, ceil(delay_in_seconds / self.tick_in_seconds))
+        timer = Timer(self._tick + ticks, callback)
+        self._insert(timer)
+        return timer
+
+    def get_remaining_seconds(self, timer: Timer) -> float:
+        return max(0, timer.deadline - self._tick) * self.tick_in_seconds
+
+    def advance(self, ticks: int = 1) -> None:
+        for _ in range(ticks):
+            self._advance()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _insert(self, timer: Timer) -> None:
+        for level in range(self.levels):
+            shift = self.slot_bits * level
+            rotation_shift = shift + self.slot_bits
+            if timer.deadline >> rotation_shift == self._tick >> rotation_shift:
+                self._wheels[level][(timer.deadline >> shift) & self._slot_mask].append(timer)
+                return
+        self._overflow.append(timer)
+
+    def _advance(self) -> None:
+        self._tick += 1
+        tick = self._tick
+        # levels whose rotation has just reached a new slot, highest first
+        wrapped = []
+        for level in range(1, self.levels + 1):
+            if tick & ((1 << (self.slot_bits * level)) - 1):
+                break
+            wrapped.append(level)
+        for level in reversed(wrapped):
+            if level == self.levels:
+                timers, self._overflow = self._overflow, []
+            else:
+                slots = self._wheels[level]
+                index = (tick >> (self.slot_bits * level)) & self._slot_mask
+                timers, slots[index] = slots[index], []
+            for timer in timers:
+                if not timer.is_cancelled:
+                    self._insert(timer)
+
+        slots = self._wheels[0]
+        index = tick & self._slot_mask
+        timers, slots[index] = slots[index], []
+        for timer in timers:
+            if timer.is_cancelled:
+                continue
+            try:
+                timer.callback()
+            except Exception:
+                logger.exception('Timer callback failed')
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        started_at = loop.time() - self._tick * self.tick_in_seconds
+        while True:
+            next_tick_at = started_at + (self._tick + 1) * self.tick_in_seconds
+            await asyncio.sleep(max(0.0, next_tick_at - loop.time()))
+            # catches up on ticks missed while the loop was busy
+            due_tick = int((loop.time() - started_at) / self.tick_in_seconds)
+            self.advance(max(1, due_tick - self._tick))
@@ -0,0 +1,25 @@
+"""orjson responses that serialize pydantic models without re-validating them."""
+from typing import Any
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _serialize_model(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # the stored field values, orjson walks nested models and lists
+        # of models without the copies `.dict()` would make
+        return obj.__dict__
+    raise TypeError(f'Type is not JSON serializable: {type(obj).__name__}')
+
+
+class ModelResponse(ORJSONResponse):
+    """Renders already validated models as they are.
+
+    Returned from a route it bypasses FastAPI's response validation, the
+    route's `response_model` then only documents it. Field aliases,
+    `exclude` and `json_encoders` are not applied.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_serialize_model, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,80 @@
+"""Production entry point: `python -m src.server`.
+
+Runs `src.main:create_app` in several uvicorn worker processes. Every worker
+calls the factory itself, so its startup builds and warms up its own engines,
+connection pool, hashing pool and history buffer, and its shutdown flushes the
+buffer and closes them. On SIGTERM uvicorn stops accepting connections and
+waits for in-flight requests before the workers shut down.
+"""
+import os
+from argparse import ArgumentParser
+from typing import Literal
+import uvicorn
+from pydantic import BaseSettings, Field, validator
+from src.auth.constants import blank_to_none, get_security_env
+
+APP = 'src.main:create_app'
+
+
+class ServerEnv(BaseSettings):
+    class Config:
+        env_file = '.env'
+    HOST: str = Field('127.0.0.1', env=['SERVER_HOST', 'TEST_HOST'])
+    PORT: int = Field(8000, env=['SERVER_PORT', 'TEST_PORT'])
+    # defaults to the number of CPU cores
+    WORKERS: int | None = Field(None, env='SERVER_WORKERS')
+    # auto picks uvloop and httptools when they are installed
+    LOOP: Literal['auto', 'asyncio', 'uvloop'] = Field('auto', env='SERVER_LOOP')
+    HTTP: Literal['auto', 'h11', 'httptools'] = Field('auto', env='SERVER_HTTP')
+    BACKLOG: int = Field(2048, env='SERVER_BACKLOG')
+    KEEP_ALIVE_IN_SECONDS: int = Field(5, env='SERVER_KEEP_ALIVE_IN_SECONDS')
+
+    _blank_workers = validator('WORKERS', pre=True, allow_reuse=True)(blank_to_none)
+
+
+def get_hashing_workers_per_worker(workers: int) -> int:
+    """Every worker owns a hashing pool, together they use each core once."""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def get_uvicorn_options(server_env: ServerEnv) -> dict:
+    return {
+        'host': server_env.HOST,
+        'port': server_env.PORT,
+        'workers': server_env.WORKERS or os.cpu_count() or 1,
+        'loop': server_env.LOOP,
+        'http': server_env.HTTP,
+        'backlog': server_env.BACKLOG,
+        'timeout_keep_alive': server_env.KEEP_ALIVE_IN_SECONDS,
+        'factory': True,
+    }
+
+
+def parse_server_env(argv: list[str] | None = None) -> ServerEnv:
+    server_env = ServerEnv()
+    parser = ArgumentParser(description='Serve the app with several worker processes.')
+    parser.add_argument('--host', default=server_env.HOST)
+    parser.add_argument('--port', type=int, default=server_env.PORT)
+    parser.add_argument('--workers', type=int, default=server_env.WORKERS)
+    parser.add_argument('--loop', choices=['auto', 'asyncio', 'uvloop'], default=server_env.LOOP)
+    parser.add_argument('--http', choices=['auto', 'h11', 'httptools'], default=server_env.HTTP)
+    args = parser.parse_args(argv)
+    return server_env.copy(update={
+        'HOST': args.host,
+        'PORT': args.port,
+        'WORKERS': args.workers,
+        'LOOP': args.loop,
+        'HTTP': args.http,
+    })
+
+
+def main(argv: list[str] | None = None) -> None:
+    options = get_uvicorn_options(parse_server_env(argv))
+    if get_security_env().HASHING_WORKERS is None:
+        # inherited by the spawned workers
+        os.environ['HASHING_WORKERS'] = str(get_hashing_workers_per_worker(options['workers']))
+    uvicorn.run(APP, **options)
+
+
+if __name__ == '__main__':
+    main()
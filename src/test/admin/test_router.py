@@ -0,0 +1,27 @@
+from unittest import TestCase
+from src.main import app
+from src.auth.dependencies import get_current_user_if_active
+from src.auth.schemas import UserSchemas
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+class TestExportEndpoints(TestCase):
+    def setUp(self) -> None:
+        self.user1 = UserSchemas.Get(
+            id=1, username='someusername', email='some@email.com', is_active=True)
+        app.dependency_overrides[get_current_user_if_active] = lambda: self.user1
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        app.dependency_overrides.clear()
+
+    def test_export_forbidden_for_regular_user(self):
+        response = self.client.get('/api/admin/export/history')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_unknown_format(self):
+        self.user1.is_superuser = True
+        response = self.client.get(
+            '/api/admin/export/history', params={'export_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
@@ -0,0 +1,31 @@
+from unittest import TestCase
+from src.main import app
+from src.auth.schemas import UserSchemas
+from src.auth.utils import secret_manager, principal_cache
+from src.pomodoro.schemas import PomodoroSchemas
+from src.pomodoro.utils import settings_cache
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+class TestBearerToken(TestCase):
+    def setUp(self) -> None:
+        self.client = TestClient(app)
+        self.user = UserSchemas.Get(
+            id=1, username='someusername', email='some@email.com', is_active=True)
+        principal_cache.set(self.user.username, self.user)
+        settings_cache.set(self.user.id, PomodoroSchemas.ReadCreate(id=1, user_id=self.user.id))
+
+    def tearDown(self) -> None:
+        principal_cache.clear()
+        settings_cache.clear()
+
+    def test_token_is_read_from_authorization_header(self):
+        token = secret_manager.generate_jwt_token({'sub': self.user.username})
+        response = self.client.get('/api/pomodoro/settings',
+                                   headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_header_is_unauthorized(self):
+        response = self.client.get('/api/pomodoro/settings')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,8 +1,14 @@
+import asyncio
+import time
+from threading import Thread
 from unittest import TestCase
-from src.auth.utils import secret_manager
+from unittest.mock import AsyncMock, patch
+from src.auth.schemas import UserSchemas
+from src.auth.utils import secret_manager, UserAsyncDBCRUD, _HashingExecutor
 from src.auth.service import AuthenticationToken
+from src.auth.throttling import get_login_throttle
 from src.auth.models import User
-from src.main import app
+from src.main import app, create_app
 from fastapi import status, Response
 from src.database import SessionLocal
 from fastapi.testclient import TestClient
@@ -10,6 +16,7 @@ from fastapi.testclient import TestClient
 
 class TestEndpoints(TestCase):
     def setUp(self) -> None:
+        get_login_throttle.cache_clear()
         self.client = TestClient(app)
         self.session = SessionLocal()
         self.plain_password1 = 'doesmatter'
@@ -76,3 +83,32 @@ class TestEndpoints(TestCase):
             headers={"content-type": "application/x-www-form-urlencoded"}
         )
         return response
+
+
+class TestAuthenticateSaturatedPool(TestCase):
+    def setUp(self) -> None:
+        get_login_throttle.cache_clear()
+        self.client = TestClient(create_app(is_warmup_enabled=False))
+        self.default_executor = secret_manager.executor
+        self.executor = _HashingExecutor(max_workers=1, queue_size=0)
+        secret_manager.executor = self.executor
+        credentials = UserSchemas.Credentials(1, secret_manager.hash_secret('password'), True)
+        self.credentials_patch = patch.object(UserAsyncDBCRUD, 'get_user_credentials',
+                                              AsyncMock(return_value=credentials))
+        self.credentials_patch.start()
+
+    def tearDown(self) -> None:
+        self.credentials_patch.stop()
+        secret_manager.executor = self.default_executor
+        self.executor.shutdown()
+        get_login_throttle.cache_clear()
+
+    def test_busy_pool_returns_503(self):
+        busy = Thread(target=asyncio.run, args=(self.executor.run(time.sleep, 2),))
+        busy.start()
+        while self.executor._in_flight == 0:
+            time.sleep(0.01)
+        response = self.client.post('/authorization',
+                                    data={'username': 'someone', 'password': 'password'})
+        busy.join()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -1,7 +1,9 @@
-from unittest import TestCase
-from src.auth.utils import UserCrud, secret_manager
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import patch
+from src.auth.utils import UserCrud, AsyncUserCrud, secret_manager
 from src.auth.schemas import UserSchemas
-from src.auth.service import Authenticator
+from src.auth.service import Authenticator, AsyncAuthenticator
+from src.auth.constants import HMAC_PEPPER_PREFIX
 from fastapi import HTTPException, status
 
 
@@ -17,6 +19,13 @@ class MockUserCrud(UserCrud):
         hashed_password = user.get('hashed_password')
         return hashed_password
 
+    def get_user_credentials(self, username: str) -> UserSchemas.Credentials:
+        user = self.mock_db.get(username, None)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
+        return UserSchemas.Credentials(
+            id=1, hashed_password=user['hashed_password'], is_active=user['is_active'])
+
     def get_user_by_username(self, username: str) -> UserSchemas.Get:
         pass
 
@@ -24,16 +33,47 @@ class MockUserCrud(UserCrud):
         user = self.mock_db.get(user_to_save.username, None)
         if user is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST)
-        for key, value in user_to_save.dict().items():
+        for key, value in user_to_save.dict(exclude_none=True).items():
             if key in user:
                 user[key] = value
         new_hash = secret_manager.hash_secret(user_to_save.password)
         user['hashed_password'] = new_hash
         self.mock_db[user['username']] = user
 
+    def update_user_hashed_password(self, username: str, hashed_password: str) -> None:
+        self.mock_db[username]['hashed_password'] = hashed_password
+
     def create_user(self, user_to_create: UserSchemas.Create) -> None:
         pass
 
+class MockAsyncUserCrud(AsyncUserCrud):
+
+    def __init__(self, mock_db: dict):
+        self.sync_crud = MockUserCrud(mock_db)
+
+    async def get_user_hashed_password_from_username(self, username: str) -> str:
+        return self.sync_crud.get_user_hashed_password_from_username(username)
+
+    async def get_user_credentials(self, username: str) -> UserSchemas.Credentials:
+        return self.sync_crud.get_user_credentials(username)
+
+    async def get_user_by_username(self, username: str) -> UserSchemas.Get:
+        return self.sync_crud.get_user_by_username(username)
+
+    async def save_user(self, user_to_save: UserSchemas.Update) -> None:
+        self.sync_crud.save_user(user_to_save)
+
+    async def update_user_hashed_password(self, username: str, hashed_password: str) -> None:
+        self.sync_crud.update_user_hashed_password(username, hashed_password)
+
+    async def create_user(self, user_to_create: UserSchemas.Create) -> None:
+        self.sync_crud.create_user(user_to_create)
+
+    async def create_users(self, users_to_create: list[UserSchemas.Create]) -> None:
+        for user_to_create in users_to_create:
+            self.sync_crud.create_user(user_to_create)
+
+
 class AuthTest(TestCase):
     def setUp(self) -> None:
         self.username1 = 'tester'
@@ -61,6 +101,33 @@ class AuthTest(TestCase):
             self.username1, self.plain_password1)
         self.assertNotEqual(authentication_result, None)
 
+    def test_legacy_hash_is_upgraded_on_login(self):
+        legacy_hash = secret_manager.pwd_context.hash(
+            secret_manager.pepper_secret_by_bcrypt(self.plain_password1))
+        self.mock_db[self.username1]['hashed_password'] = legacy_hash
+        _ = self.authenticator.get_auth_token_or_none(
+            self.username1, self.plain_password1)
+
+        upgraded_hash = self.mock_db[self.username1]['hashed_password']
+        self.assertTrue(upgraded_hash.startswith(HMAC_PEPPER_PREFIX))
+        self.assertTrue(secret_manager.is_secret_correct(
+            upgraded_hash, self.plain_password1))
+
+    def test_current_hash_is_kept_on_login(self):
+        _ = self.authenticator.get_auth_token_or_none(
+            self.username1, self.plain_password1)
+        self.assertEqual(
+            self.mock_db[self.username1]['hashed_password'], self.hashed_password1)
+
+    def test_inactive_user_is_rejected_before_hashing(self):
+        self.mock_db[self.username1]['is_active'] = False
+        with patch.object(secret_manager, 'verify_and_update') as verify_and_update:
+            with self.assertRaises(HTTPException) as context:
+                _ = self.authenticator.get_auth_token_or_none(
+                    self.username1, self.plain_password1)
+        self.assertEqual(context.exception.status_code, status.HTTP_401_UNAUTHORIZED)
+        verify_and_update.assert_not_called()
+
     def test_incorrect_authentication(self):
         try:
             _ = self.authenticator.get_auth_token_or_none(
@@ -112,6 +179,15 @@ class AuthTest(TestCase):
             id=1
         )
 
+    def test_try_change_without_stored_password(self):
+        self.mock_db[self.username1]['hashed_password'] = None
+        new_password_form = UserSchemas.FormPasswordChange(
+            old_password=self.plain_password1, new_password=self.new_password1)
+        with self.assertRaises(HTTPException) as context:
+            self.authenticator.change_user_password(
+                new_password_form, self._user1_get_scheme())
+        self.assertEqual(context.exception.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_try_change_with_similar_passwords(self):
         new_password_form = UserSchemas.FormPasswordChange(
             old_password=self.plain_password1, new_password=self.plain_password1)
@@ -134,3 +210,51 @@ class AuthTest(TestCase):
             id=1
         )
 
+
+class AsyncAuthTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.username1 = 'tester'
+        self.plain_password1 = 'test_password'
+        self.hashed_password1 = secret_manager.hash_secret(
+            self.plain_password1)
+        self.mock_db = {
+            self.username1: {
+                'username': self.username1,
+                'email': 'tester@email.com',
+                'hashed_password': self.hashed_password1,
+                'is_active': True
+            }
+        }
+        self.authenticator = AsyncAuthenticator(
+            MockAsyncUserCrud(mock_db=self.mock_db))
+
+    async def test_correct_authenticate(self):
+        authentication_result = await self.authenticator.get_auth_token_or_none(
+            self.username1, self.plain_password1)
+        self.assertNotEqual(authentication_result, None)
+
+    async def test_inactive_user_is_rejected(self):
+        self.mock_db[self.username1]['is_active'] = False
+        with self.assertRaises(HTTPException) as context:
+            _ = await self.authenticator.get_auth_token_or_none(
+                self.username1, self.plain_password1)
+        self.assertEqual(context.exception.status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    async def test_incorrect_authentication(self):
+        with self.assertRaises(HTTPException) as context:
+            _ = await self.authenticator.get_auth_token_or_none(
+                self.username1, 'saass')
+        self.assertEqual(context.exception.status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    async def test_try_change_with_correct_password(self):
+        new_password_form = UserSchemas.FormPasswordChange(
+            old_password=self.plain_password1, new_password='new_password')
+        current_user = UserSchemas.Get(
+            username=self.username1, email='tester@email.com', is_active=True, id=1)
+        await self.authenticator.change_user_password(
+            new_password_form, current_user)
+        self.assertNotEqual(
+            self.mock_db[self.username1]['hashed_password'], self.hashed_password1)
+
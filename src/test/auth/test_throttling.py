@@ -0,0 +1,130 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+from fastapi import HTTPException, status
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from src.auth.models import LoginAttemptBucket
+from src.auth.throttling import (
+    DatabaseThrottleBackend, DisabledThrottleBackend, InMemoryThrottleBackend, LoginThrottle, ThrottleRule,
+    get_login_throttle, get_retry_after, get_username_key, take_token)
+from src.main import create_app
+
+RULE = ThrottleRule(burst=3, rate_per_second=0.5)
+
+
+class TestTokenBucket(TestCase):
+    def test_burst_then_rejection(self):
+        tokens = RULE.burst
+        for _ in range(RULE.burst):
+            tokens = take_token(tokens, 0, RULE)
+            self.assertEqual(get_retry_after(tokens, RULE), 0)
+        # the rejected attempt costs a token too
+        tokens = take_token(tokens, 0, RULE)
+        self.assertEqual(get_retry_after(tokens, RULE), 4)
+
+    def test_rejected_attempts_keep_bucket_closed(self):
+        tokens = take_token(-1.0, 1, RULE)
+        self.assertEqual(tokens, -1.0)
+        self.assertEqual(get_retry_after(tokens, RULE), 4)
+
+    def test_refill_is_capped_by_burst(self):
+        self.assertEqual(take_token(0, 3600, RULE), RULE.burst - 1)
+
+
+class TestInMemoryThrottleBackend(IsolatedAsyncioTestCase):
+    async def test_bucket_refills_with_time(self):
+        backend = InMemoryThrottleBackend(max_keys=10)
+        with patch('src.auth.throttling.monotonic', return_value=100.0):
+            results = [await backend.take('key', RULE) for _ in range(RULE.burst + 1)]
+        self.assertEqual(results[:-1], [0] * RULE.burst)
+        self.assertEqual(results[-1], 4)
+        with patch('src.auth.throttling.monotonic', return_value=104.0):
+            self.assertEqual(await backend.take('key', RULE), 0)
+
+    async def test_keys_are_bounded_and_expire(self):
+        backend = InMemoryThrottleBackend(max_keys=2)
+        with patch('src.auth.throttling.monotonic', return_value=0.0):
+            for key in ('a', 'b', 'c'):
+                await backend.take(key, RULE)
+        self.assertEqual(len(backend), 2)
+        # one token is back after 2 seconds, the buckets are full and gone
+        with patch('src.auth.throttling.monotonic', return_value=2.0):
+            await backend.take('d', RULE)
+        self.assertEqual(len(backend), 1)
+
+
+class TestDatabaseThrottleBackend(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        async with self.engine.begin() as connection:
+            await connection.run_sync(LoginAttemptBucket.__table__.create)
+        self.backend = DatabaseThrottleBackend(async_sessionmaker(self.engine))
+
+    async def asyncTearDown(self) -> None:
+        await self.engine.dispose()
+
+    async def test_matches_in_memory_backend(self):
+        in_memory = InMemoryThrottleBackend(max_keys=10)
+        for now in (0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 5.0, 5.0):
+            with patch('src.auth.throttling.time', return_value=now), \
+                    patch('src.auth.throttling.monotonic', return_value=now):
+                self.assertAlmostEqual(await self.backend.take('key', RULE),
+                                       await in_memory.take('key', RULE))
+
+    async def test_expired_buckets_are_purged(self):
+        with patch('src.auth.throttling.time', return_value=0.0):
+            await self.backend.take('old', RULE)
+        with patch('src.auth.throttling.time', return_value=3600.0):
+            await self.backend.take('new', RULE)
+        async with self.backend.session_maker() as session:
+            keys = (await session.scalars(LoginAttemptBucket.__table__.select())).all()
+        self.assertEqual(keys, ['new'])
+
+
+class TestLoginThrottle(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.throttle = LoginThrottle(InMemoryThrottleBackend(max_keys=10),
+                                      username_rule=ThrottleRule(2, 1 / 30),
+                                      address_rule=ThrottleRule(3, 1))
+
+    async def test_username_limit_raises_429(self):
+        await self.throttle.check('User', '10.0.0.1')
+        await self.throttle.check('user', '10.0.0.2')
+        with self.assertRaises(HTTPException) as context:
+            await self.throttle.check('USER', '10.0.0.3')
+        self.assertEqual(context.exception.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(context.exception.headers['Retry-After'], '60')
+
+    async def test_username_keys_have_fixed_length(self):
+        self.assertEqual(get_username_key('User'), get_username_key('user'))
+        self.assertEqual(len(get_username_key('u' * 10_000)), len(get_username_key('u')))
+
+    async def test_disabled_backend_lets_everything_through(self):
+        self.throttle.backend = DisabledThrottleBackend()
+        for _ in range(10):
+            await self.throttle.check('user', '10.0.0.1')
+
+    async def test_address_limit_spans_usernames(self):
+        for username in ('a', 'b', 'c'):
+            await self.throttle.check(username, '10.0.0.1')
+        with self.assertRaises(HTTPException):
+            await self.throttle.check('d', '10.0.0.1')
+        await self.throttle.check('d', '10.0.0.2')
+
+
+class TestAuthenticateThrottling(TestCase):
+    def setUp(self) -> None:
+        get_login_throttle.cache_clear()
+        self.client = TestClient(create_app(is_warmup_enabled=False))
+
+    def tearDown(self) -> None:
+        get_login_throttle.cache_clear()
+
+    def test_throttled_before_database(self):
+        throttle = get_login_throttle()
+        throttle.username_rule = ThrottleRule(0, 1 / 60)
+        response = self.client.post('/authorization',
+                                    data={'username': 'someone', 'password': 'whatever'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.headers['Retry-After'], '120')
@@ -0,0 +1,84 @@
+from unittest import TestCase
+import ecdsa
+import rsa
+from jose import JWTError, jwt
+from src.auth.constants import JWTKeySettings, SecurityEnv
+from src.auth.tokens import JWTKeyRing, build_jwt_key_ring, parse_jwt_key
+
+
+def build_security_env(**kwargs) -> SecurityEnv:
+    kwargs.setdefault('SECRET_JWT_KEY', None)
+    return SecurityEnv(_env_file=None, TOKEN_LIFETIME_IN_MINTUTES=15,
+                       HASHING_SCHEME='bcrypt', PEPER_SECRET='0' * 22, **kwargs)
+
+
+class TestJWTKeyRing(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        public_key, private_key = rsa.newkeys(2048)
+        cls.rsa_private_pem = private_key.save_pkcs1().decode()
+        cls.rsa_public_pem = public_key.save_pkcs1().decode()
+        signing_key = ecdsa.SigningKey.generate(curve=ecdsa.NIST256p)
+        cls.ec_private_pem = signing_key.to_pem().decode()
+        cls.ec_public_pem = signing_key.get_verifying_key().to_pem().decode()
+
+    def test_legacy_secret_tokens_have_no_kid(self):
+        key_ring = build_jwt_key_ring(build_security_env(SECRET_JWT_KEY='secret'))
+        token = key_ring.encode({'sub': 'user'})
+        self.assertNotIn('kid', jwt.get_unverified_header(token))
+        self.assertEqual(jwt.decode(token, 'secret', algorithms=['HS256']), {'sub': 'user'})
+        self.assertEqual(key_ring.decode(token), {'sub': 'user'})
+
+    def test_rotation_keeps_old_tokens_valid(self):
+        old_key = JWTKeySettings(kid='old', algorithm='HS256', key='old secret')
+        new_key = JWTKeySettings(kid='new', algorithm='ES256', key=self.ec_private_pem)
+        old_ring = build_jwt_key_ring(build_security_env(
+            JWT_KEYS=[old_key], JWT_SIGNING_KID='old'))
+        new_ring = build_jwt_key_ring(build_security_env(
+            JWT_KEYS=[old_key, new_key], JWT_SIGNING_KID='new'))
+        old_token = old_ring.encode({'sub': 'old'})
+        new_token = new_ring.encode({'sub': 'new'})
+        self.assertEqual(jwt.get_unverified_header(new_token)['kid'], 'new')
+        self.assertEqual(new_ring.decode(old_token), {'sub': 'old'})
+        self.assertEqual(new_ring.decode(new_token), {'sub': 'new'})
+        with self.assertRaises(JWTError):
+            old_ring.decode(new_token)
+
+    def test_replica_verifies_with_public_key_only(self):
+        signer = JWTKeyRing([parse_jwt_key('rsa', 'RS256', self.rsa_private_pem)], 'rsa')
+        replica = build_jwt_key_ring(build_security_env(
+            JWT_KEYS=[JWTKeySettings(kid='rsa', algorithm='RS256', key=self.rsa_public_pem)]))
+        self.assertEqual(replica.decode(signer.encode({'sub': 'user'})), {'sub': 'user'})
+        with self.assertRaises(RuntimeError):
+            replica.encode({'sub': 'user'})
+        with self.assertRaises(ValueError):
+            JWTKeyRing(replica.keys.values(), 'rsa')
+
+    def test_key_algorithm_is_enforced(self):
+        key_ring = JWTKeyRing([parse_jwt_key('ec', 'ES256', self.ec_public_pem)], is_signing=False)
+        # the ES256 key never accepts tokens of another algorithm
+        forged = jwt.encode({'sub': 'admin'}, 'guessed', algorithm='HS256',
+                            headers={'kid': 'ec'})
+        with self.assertRaises(JWTError):
+            key_ring.decode(forged)
+
+    def test_unknown_or_malformed_kid_is_rejected(self):
+        key_ring = JWTKeyRing([parse_jwt_key('a', 'HS256', 'secret')], 'a')
+        for kid in ('b', ['a']):
+            token = jwt.encode({'sub': 'user'}, 'secret', algorithm='HS256', headers={'kid': kid})
+            with self.assertRaises(JWTError):
+                key_ring.decode(token)
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            build_jwt_key_ring(build_security_env())
+        with self.assertRaises(ValueError):
+            parse_jwt_key('ed', 'EdDSA', 'secret')
+        with self.assertRaises(ValueError):
+            JWTKeySettings(kid='a', algorithm='HS256')
+
+
+class TestSecurityEnv(TestCase):
+    def test_blank_hashing_workers_is_unset(self):
+        self.assertIsNone(build_security_env(HASHING_WORKERS='').HASHING_WORKERS)
+        self.assertEqual(build_security_env(HASHING_WORKERS='4').HASHING_WORKERS, 4)
@@ -1,5 +1,12 @@
-from unittest import TestCase
-from src.auth.utils import secret_manager, UserDBCRUD
+import asyncio
+import time
+from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from src.auth.utils import (
+    secret_manager, principal_cache, UserDBCRUD, UserAsyncDBCRUD, _HashingExecutor)
 from src.auth.schemas import UserSchemas
 from src.auth.models import User
 from fastapi import HTTPException, status
@@ -47,6 +54,15 @@ class TestDBCRUD(TestCase):
             _ = self.crud.get_user_hashed_password_from_username(
                 'NOT EXISTENT SHIT')
 
+    def test_get_user_credentials(self):
+        credentials = self.crud.get_user_credentials(self.user1.username)
+        self.assertEqual(credentials,
+                         (self.user1.id, self.user1.hashed_password, self.user1.is_active))
+
+    def test_get_user_credentials_incorrect(self):
+        with self.assertRaises(HTTPException):
+            _ = self.crud.get_user_credentials('NOT EXISTENT SHIT')
+
     def test_update_user(self):
         user_scheme_to_save = UserSchemas.Update(**self.user1.__dict__)
         new_email = 'new@mail.ru'
@@ -86,3 +102,139 @@ class TestDBCRUD(TestCase):
             raise TypeError('Cant go here')
         except HTTPException as exc:
             self.assertEqual(exc.status_code, status.HTTP_409_CONFLICT)
+
+
+class TestHashingExecutor(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.executor = _HashingExecutor(max_workers=1, queue_size=0)
+        self.default_executor = secret_manager.executor
+
+    def tearDown(self) -> None:
+        secret_manager.executor = self.default_executor
+        self.executor.shutdown()
+
+    async def test_rejects_when_full(self):
+        busy = asyncio.create_task(self.executor.run(time.sleep, 1))
+        await asyncio.sleep(0)
+        with self.assertRaises(HTTPException) as context:
+            await self.executor.run(time.sleep, 0)
+        self.assertEqual(context.exception.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+        await busy
+        await self.executor.run(time.sleep, 0)
+
+    async def test_warm_up_starts_workers(self):
+        await self.executor.warm_up()
+        self.assertEqual(len(self.executor._get_pool()._processes), 1)
+
+    async def test_secret_roundtrip(self):
+        secret_manager.executor = self.executor
+        hashed_secret = await secret_manager.hash_secret_async('some_secret')
+        self.assertTrue(await secret_manager.is_secret_correct_async(
+            hashed_secret, 'some_secret'))
+        self.assertFalse(await secret_manager.is_secret_correct_async(
+            hashed_secret, 'other_secret'))
+
+    async def test_bulk_hashing_waits_for_a_full_pool(self):
+        secret_manager.executor = self.executor
+        busy = asyncio.create_task(self.executor.run(time.sleep, 0.5))
+        await asyncio.sleep(0)
+        hashed_secrets = await secret_manager.hash_secrets_async(['some_secret'])
+        self.assertTrue(secret_manager.is_secret_correct(hashed_secrets[0], 'some_secret'))
+        await busy
+
+    async def test_bulk_hashing_is_cancelled_on_failure(self):
+        cancelled = []
+
+        async def run_bulk(func, chunk):
+            if chunk == ['first']:
+                raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(chunk)
+                raise
+
+        secret_manager.executor = self.executor
+        with patch.object(self.executor, 'run_bulk', run_bulk):
+            with self.assertRaises(HTTPException):
+                await secret_manager.hash_secrets_async(['first', 'second', 'third'],
+                                                        chunk_size=1)
+            await asyncio.sleep(0)
+        self.assertEqual(cancelled, [['second'], ['third']])
+
+    async def test_missing_hash_never_matches(self):
+        self.assertEqual(secret_manager.verify_and_update(None, 'some_secret'), (False, None))
+        self.assertFalse(await secret_manager.is_secret_correct_async(None, 'some_secret'))
+
+    async def test_bulk_hashing_stays_within_queue(self):
+        secret_manager.executor = self.executor
+        secrets = ['first_secret', 'second_secret', 'third_secret']
+        hashed_secrets = await secret_manager.hash_secrets_async(secrets, chunk_size=2)
+        self.assertEqual(len(hashed_secrets), 3)
+        for secret, hashed_secret in zip(secrets, hashed_secrets):
+            self.assertTrue(secret_manager.is_secret_correct(hashed_secret, secret))
+
+
+def build_user(username: str, email: str) -> UserSchemas.Create:
+    return UserSchemas.Create(username=username, email=email, password='password')
+
+
+class TestBulkCreateUsers(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        async with self.engine.begin() as connection:
+            await connection.run_sync(User.__table__.create)
+            await connection.execute(insert(User).values(
+                username='existing', email='existing@email.com', hashed_password='hash'))
+        self.session = async_sessionmaker(self.engine)()
+        self.crud = UserAsyncDBCRUD(self.session)
+        hash_secrets = AsyncMock(side_effect=lambda secrets: [f'hash {s}' for s in secrets])
+        self.hash_patch = patch.object(secret_manager, 'hash_secrets_async', hash_secrets)
+        self.hash_secrets = self.hash_patch.start()
+
+    async def asyncTearDown(self) -> None:
+        self.hash_patch.stop()
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def test_conflicts_are_reported_per_row(self):
+        result = await self.crud.create_users([
+            build_user('first', 'first@email.com'),
+            build_user('existing', 'other@email.com'),
+            build_user('second', 'existing@email.com'),
+            build_user('first', 'first@email.com'),
+            build_user('third', 'third@email.com'),
+        ])
+        self.assertEqual([user.username for user in result.created], ['first', 'third'])
+        self.assertEqual([(conflict.index, conflict.fields) for conflict in result.conflicts],
+                         [(1, ['username']), (2, ['email']), (3, ['username', 'email'])])
+        # conflicting passwords are never hashed
+        self.hash_secrets.assert_awaited_once_with(['password', 'password'])
+
+    async def test_concurrently_inserted_users_are_skipped(self):
+        no_conflicts = {'username': set(), 'email': set()}
+        with patch.object(UserAsyncDBCRUD, '_get_taken_values', AsyncMock(side_effect=[
+                no_conflicts, {'username': {'existing'}, 'email': {'existing@email.com'}}])):
+            result = await self.crud.create_users([
+                build_user('existing', 'existing@email.com'),
+                build_user('first', 'first@email.com'),
+            ])
+        self.assertEqual([user.username for user in result.created], ['first'])
+        self.assertEqual(result.conflicts, [UserSchemas.Conflict(
+            index=0, username='existing', fields=['username', 'email'])])
+
+
+    async def test_rename_drops_both_cached_principals(self):
+        user_id = await self.session.scalar(select(User.id).where(User.username == 'existing'))
+        cached = UserSchemas.Get(id=user_id, username='existing',
+                                 email='existing@email.com', is_active=True)
+        principal_cache.set('existing', cached)
+        principal_cache.set('renamed', cached)
+        try:
+            await self.crud.save_user(UserSchemas.Update(id=user_id, username='renamed'))
+            await self.session.commit()
+            self.assertIsNone(principal_cache.get('existing'))
+            self.assertIsNone(principal_cache.get('renamed'))
+        finally:
+            principal_cache.clear()
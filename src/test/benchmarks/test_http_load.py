@@ -0,0 +1,11 @@
+from unittest import TestCase
+from src.benchmarks.http_load import report
+from src.benchmarks.stats import summarize_latencies
+
+
+class TestHttpLoadReport(TestCase):
+    def test_report_fails_on_errors(self):
+        result = summarize_latencies([0.01] * 60, 1.0, errors=55)
+        self.assertFalse(report({'login': result}, {}, max_regression=None))
+        result = summarize_latencies([0.01] * 60, 1.0, errors=0)
+        self.assertTrue(report({'login': result}, {}, max_regression=None))
@@ -0,0 +1,19 @@
+from unittest import TestCase
+from src.benchmarks.micro import measure, report
+
+
+class TestMicroBenchmarks(TestCase):
+    def test_measure_runs_warmup_and_repetitions(self):
+        calls = []
+        result = measure(lambda: calls.append(1), repeat=3, warmup=2, min_sample_time=0)
+        self.assertEqual(result['number'], 1)
+        self.assertEqual(result['repeat'], 3)
+        # warmup, one calibration call and the repetitions
+        self.assertEqual(len(calls), 2 + 1 + 3)
+
+    def test_report_fails_on_slower_median(self):
+        result = {'number': 1, 'repeat': 3, 'median_us': 15.0, 'min_us': 14.0, 'stdev_us': 1.0}
+        baselines = {'slow': {'median_us': 10.0}}
+        self.assertFalse(report({'slow': result}, baselines, tolerance=0.2))
+        self.assertTrue(report({'slow': result}, baselines, tolerance=0.6))
+        self.assertTrue(report({'new': result}, baselines, tolerance=0.2))
@@ -0,0 +1,52 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from src.benchmarks.stats import (
+    percentile,
+    summarize_latencies,
+    load_baselines,
+    save_baselines,
+    relative_change,
+    is_regression,
+    summarize_samples,
+)
+
+
+class TestStats(TestCase):
+    def test_nearest_rank_percentile(self):
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 50), 0)
+
+    def test_summary_is_in_milliseconds(self):
+        summary = summarize_latencies([0.002, 0.001], elapsed=0.5, errors=1)
+        self.assertEqual(summary['requests'], 2)
+        self.assertEqual(summary['throughput'], 4)
+        self.assertEqual(summary['p50_ms'], 1)
+        self.assertEqual(summary['p99_ms'], 2)
+
+    def test_saved_baselines_are_merged(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / 'baseline.json'
+            save_baselines(path, {'login': {'p95_ms': 1.0}})
+            save_baselines(path, {'get_settings': {'p95_ms': 2.0}})
+            self.assertEqual(set(load_baselines(path)), {'login', 'get_settings'})
+
+    def test_relative_change_without_baseline(self):
+        self.assertIsNone(relative_change(1.0, None))
+        self.assertAlmostEqual(relative_change(1.5, 1.0), 0.5)
+
+    def test_regression_above_tolerance(self):
+        baseline = {'median_us': 10.0}
+        self.assertFalse(is_regression({'median_us': 11.0}, baseline, 'median_us', 0.2))
+        self.assertTrue(is_regression({'median_us': 13.0}, baseline, 'median_us', 0.2))
+        self.assertFalse(is_regression({'median_us': 13.0}, {}, 'median_us', 0.2))
+
+    def test_samples_summary_is_in_microseconds(self):
+        summary = summarize_samples([0.000001, 0.000003, 0.000002], number=4)
+        self.assertEqual(summary['repeat'], 3)
+        self.assertEqual(summary['number'], 4)
+        self.assertAlmostEqual(summary['median_us'], 2)
+        self.assertAlmostEqual(summary['min_us'], 1)
@@ -0,0 +1,55 @@
+from unittest import TestCase, IsolatedAsyncioTestCase
+from src.monitoring.metrics import Counter, Histogram, timed, timed_methods
+
+
+class TestMetrics(TestCase):
+    def test_counter_render(self):
+        counter = Counter('requests_total', 'Requests.', ('route',))
+        counter.inc(route='/a')
+        counter.inc(2, route='/a')
+        counter.inc(route='/"b"')
+        rendered = counter.render()
+        self.assertIn('# TYPE requests_total counter', rendered)
+        self.assertIn('requests_total{route="/a"} 3', rendered)
+        self.assertIn('requests_total{route="/\\"b\\""} 1', rendered)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+        rendered = histogram.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', rendered)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3', rendered)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', rendered)
+        self.assertIn('latency_seconds_sum 5.65', rendered)
+        self.assertIn('latency_seconds_count 4', rendered)
+
+    def test_timed_methods(self):
+        histogram = Histogram('crud_seconds', 'CRUD.', ('crud', 'method'))
+
+        @timed_methods(histogram)
+        class SomeCRUD:
+            def get(self) -> int:
+                return 1
+
+            def _private(self) -> int:
+                return 2
+
+        crud = SomeCRUD()
+        self.assertEqual(crud.get(), 1)
+        self.assertEqual(crud._private(), 2)
+        rendered = histogram.render()
+        self.assertIn('crud_seconds_count{crud="SomeCRUD",method="get"} 1', rendered)
+        self.assertNotIn('_private', rendered)
+
+
+class TestAsyncTimed(IsolatedAsyncioTestCase):
+    async def test_timed_coroutine(self):
+        histogram = Histogram('operation_seconds', 'Operation.', ('operation',))
+
+        @timed(histogram, operation='sleep')
+        async def operation() -> str:
+            return 'done'
+
+        self.assertEqual(await operation(), 'done')
+        self.assertIn('operation_seconds_count{operation="sleep"} 1', histogram.render())
@@ -0,0 +1,55 @@
+from unittest import TestCase
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from src.monitoring.constants import QUERY_COUNT_HEADER, QUERY_TIME_HEADER
+from src.monitoring.middleware import RoutePathResolver, SQLProfilerMiddleware
+from src.monitoring.profiler import attach_sql_profiler
+
+
+def build_app(is_debug: bool) -> FastAPI:
+    app = FastAPI()
+    route_resolver = RoutePathResolver(app.routes)
+    engine = create_engine('sqlite://')
+    async_engine = create_async_engine('sqlite+aiosqlite://')
+    for profiled_engine in (engine, async_engine.sync_engine):
+        attach_sql_profiler(profiled_engine, slow_query_threshold_in_ms=1000)
+    app.add_middleware(SQLProfilerMiddleware,
+                       route_resolver=route_resolver,
+                       query_count_threshold=2,
+                       is_debug=is_debug)
+
+    @app.get('/sync/{count}')
+    def sync_queries(count: int):
+        with engine.connect() as connection:
+            for _ in range(count):
+                connection.execute(text('SELECT 1'))
+
+    @app.get('/async/{count}')
+    async def async_queries(count: int):
+        async with async_engine.connect() as connection:
+            for _ in range(count):
+                await connection.execute(text('SELECT 1'))
+
+    return app
+
+
+class TestSQLProfilerMiddleware(TestCase):
+    def test_statements_are_counted_in_debug_headers(self):
+        client = TestClient(build_app(is_debug=True))
+        for url in ('/sync/2', '/async/2'):
+            response = client.get(url)
+            self.assertEqual(response.headers[QUERY_COUNT_HEADER], '2')
+            self.assertGreaterEqual(float(response.headers[QUERY_TIME_HEADER]), 0)
+
+    def test_headers_are_hidden_without_debug(self):
+        client = TestClient(build_app(is_debug=False))
+        response = client.get('/sync/1')
+        self.assertNotIn(QUERY_COUNT_HEADER, response.headers)
+
+    def test_chatty_route_is_logged_by_template(self):
+        client = TestClient(build_app(is_debug=False))
+        with self.assertLogs('src.monitoring.middleware', level='WARNING') as logs:
+            client.get('/async/3')
+        self.assertIn('GET /async/{count} ran 3 queries', logs.output[0])
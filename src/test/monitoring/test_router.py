@@ -0,0 +1,39 @@
+from unittest import TestCase
+from src.main import app
+from src.auth.dependencies import get_current_user_if_active
+from src.auth.schemas import UserSchemas
+from src.pomodoro.schemas import PomodoroSchemas
+from src.pomodoro.utils import settings_cache
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+class TestMetricsEndpoint(TestCase):
+    def setUp(self) -> None:
+        user = UserSchemas.Get(
+            id=1, username='someusername', email='some@email.com', is_active=True)
+        app.dependency_overrides[get_current_user_if_active] = lambda: user
+        settings_cache.set(user.id, PomodoroSchemas.ReadCreate(id=1, user_id=user.id))
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        app.dependency_overrides.clear()
+        settings_cache.clear()
+
+    def test_requests_are_counted_by_route(self):
+        self.client.get('/api/pomodoro/settings')
+        self.client.get('/not/existing/route')
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.headers['content-type'].startswith('text/plain'))
+        self.assertIn(
+            'http_requests_total{method="GET",route="/api/pomodoro/settings",status="200"}',
+            response.text)
+        self.assertIn(
+            'http_requests_total{method="GET",route="<unmatched>",status="404"}',
+            response.text)
+        self.assertIn('cache_statistics{cache="pomodoro_settings",statistic="hits"}',
+                      response.text)
+        self.assertIn('db_pool_statistics{engine="sync",statistic="checked_out"} 0',
+                      response.text)
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta
+from unittest import IsolatedAsyncioTestCase
+from src.pomodoro.buffer import HistoryWriteBuffer
+from src.pomodoro.schemas import HistorySchemas
+from fastapi import HTTPException, status
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+
+class TestHistoryWriteBuffer(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.written_batches = []
+        self.fail_writes = False
+        self.bad_user_ids = set()
+        self.buffer = HistoryWriteBuffer(
+            flush_interval_in_ms=50, flush_size=3, max_size=5, writer=self._writer)
+
+    async def asyncTearDown(self) -> None:
+        await self.buffer.stop()
+
+    async def _writer(self, batch: list[HistorySchemas.Create]) -> None:
+        if self.fail_writes:
+            raise OperationalError('INSERT', {}, Exception('connection lost'))
+        if any(record.user_id in self.bad_user_ids for record in batch):
+            raise IntegrityError('INSERT', {}, Exception('foreign key violation'))
+        self.written_batches.append(batch)
+
+    def _records(self, count: int, user_id: int = 1) -> list[HistorySchemas.Create]:
+        return [HistorySchemas.Create(user_id=user_id, duration_in_seconds=60)
+                for _ in range(count)]
+
+    async def test_flush_by_size(self):
+        self.buffer.flush_interval_in_ms = 60_000
+        self.buffer.start()
+        await self.buffer.put(self._records(4))
+        await asyncio.sleep(0.01)
+        self.assertEqual([len(batch) for batch in self.written_batches], [3, 1])
+
+    async def test_flush_by_interval(self):
+        self.buffer.start()
+        await self.buffer.put(self._records(1))
+        self.assertEqual(self.written_batches, [])
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(self.written_batches), 1)
+
+    async def test_drain_on_stop(self):
+        self.buffer.flush_interval_in_ms = 60_000
+        self.buffer.start()
+        await self.buffer.put(self._records(2))
+        await self.buffer.stop()
+        self.assertEqual(len(self.written_batches), 1)
+        self.assertEqual(len(self.buffer), 0)
+
+    async def test_full_buffer(self):
+        await self.buffer.put(self._records(5))
+        with self.assertRaises(HTTPException) as context:
+            await self.buffer.put(self._records(1))
+        self.assertEqual(context.exception.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    async def test_failed_write_is_kept(self):
+        await self.buffer.put(self._records(2))
+        self.fail_writes = True
+        with self.assertLogs('src.pomodoro.buffer'):
+            await self.buffer.flush()
+        self.assertEqual(len(self.buffer), 2)
+        self.fail_writes = False
+        await self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+
+    async def test_rejected_records_are_isolated(self):
+        self.bad_user_ids = {2}
+        await self.buffer.put(self._records(2) + self._records(1, user_id=2)
+                              + self._records(2))
+        with self.assertLogs('src.pomodoro.buffer') as logs:
+            await self.buffer.flush()
+        self.assertEqual(len(self.buffer), 0)
+        written = [record.user_id for batch in self.written_batches for record in batch]
+        self.assertEqual(written, [1, 1, 1, 1])
+        self.assertEqual(len(logs.records), 1)
+
+    async def test_conflicts_raised_as_http_errors_are_isolated(self):
+        async def writer(batch):
+            if any(record.user_id == 2 for record in batch):
+                raise HTTPException(status.HTTP_409_CONFLICT, 'Already exists')
+            self.written_batches.append(batch)
+        self.buffer._writer = writer
+        await self.buffer.put(self._records(1, user_id=2) + self._records(2))
+        with self.assertLogs('src.pomodoro.buffer'):
+            await self.buffer.flush()
+        self.assertEqual(sum(map(len, self.written_batches)), 2)
+
+    async def test_stop_reports_lost_records(self):
+        await self.buffer.put(self._records(2))
+        self.fail_writes = True
+        with self.assertLogs('src.pomodoro.buffer') as logs:
+            await self.buffer.stop()
+        self.assertIn('Lost 2 history records', logs.output[-1])
+        self.fail_writes = False
+
+    async def test_pool_timeout_keeps_whole_batch(self):
+        calls = []
+
+        async def writer(batch):
+            calls.append(batch)
+            raise PoolTimeoutError('QueuePool limit reached, connection timed out')
+        self.buffer._writer = writer
+        await self.buffer.put(self._records(3))
+        with self.assertLogs('src.pomodoro.buffer'):
+            await self.buffer.flush()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(self.buffer), 3)
+
+    async def test_deadlock_is_retried(self):
+        deadlock = Exception('deadlock detected')
+        deadlock.pgcode = '40P01'
+
+        async def writer(batch):
+            raise DBAPIError('INSERT', {}, deadlock)
+        self.buffer._writer = writer
+        await self.buffer.put(self._records(2))
+        with self.assertLogs('src.pomodoro.buffer'):
+            await self.buffer.flush()
+        self.assertEqual(len(self.buffer), 2)
+
+    async def test_end_is_stamped_when_accepted(self):
+        utc_end = datetime(2026, 10, 18, 23, 59)
+        await self.buffer.put(self._records(1) + [
+            HistorySchemas.Create(user_id=1, duration_in_seconds=60, utc_end=utc_end)])
+        accepted_at = datetime.utcnow()
+        await asyncio.sleep(0.01)
+        await self.buffer.flush()
+        stamped, explicit = self.written_batches[0]
+        self.assertLess(accepted_at - stamped.utc_end, timedelta(seconds=1))
+        self.assertLessEqual(stamped.utc_end, accepted_at)
+        self.assertEqual(explicit.utc_end, utc_end)
@@ -0,0 +1,41 @@
+from unittest import TestCase
+from src.main import app
+from src.auth.dependencies import get_current_user_if_active
+from src.auth.schemas import UserSchemas
+from src.pomodoro.schemas import PomodoroSchemas
+from src.pomodoro.utils import settings_cache
+from fastapi import status
+from fastapi.testclient import TestClient
+
+
+class TestSettingsEndpoints(TestCase):
+    def setUp(self) -> None:
+        self.user1 = UserSchemas.Get(
+            id=1, username='someusername', email='some@email.com', is_active=True)
+        app.dependency_overrides[get_current_user_if_active] = lambda: self.user1
+        self.client = TestClient(app)
+        self.settings1 = PomodoroSchemas.ReadCreate(id=1, user_id=self.user1.id)
+        settings_cache.set(self.user1.id, self.settings1)
+
+    def tearDown(self) -> None:
+        app.dependency_overrides.clear()
+        settings_cache.clear()
+
+    def test_get_cached_settings(self):
+        response = self.client.get('/api/pomodoro/settings')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(PomodoroSchemas.ReadCreate(
+            **response.json()), self.settings1)
+        self.assertIn('ETag', response.headers)
+
+    def test_not_modified_when_etag_matches(self):
+        etag = self.client.get('/api/pomodoro/settings').headers['ETag']
+        response = self.client.get(
+            '/api/pomodoro/settings', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_modified_when_etag_differs(self):
+        response = self.client.get(
+            '/api/pomodoro/settings', headers={'If-None-Match': '"outdated"'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from unittest import IsolatedAsyncioTestCase, TestCase
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from src.auth.dependencies import get_current_user_if_active
+from src.auth.models import User
+from src.auth.schemas import UserSchemas
+from src.main import create_app
+from src.pomodoro.models import Pomodoro
+from src.pomodoro.phases import Phase, get_phase_offsets
+from src.pomodoro.schemas import PomodoroSchemas
+from src.pomodoro.utils import PomodoroAsyncCRUDDB, build_schedule, build_schedule_groups
+
+UTC_START = datetime(2026, 10, 18, 10, 0)
+
+
+class TestSchedule(TestCase):
+    def test_offsets_are_memoized_on_settings(self):
+        offsets = get_phase_offsets(25, 5, 15, 4)
+        self.assertIs(get_phase_offsets(25, 5, 15, 4), offsets)
+        self.assertEqual(offsets[-1].end_offset_in_seconds, (4 * 25 + 3 * 5 + 15) * 60)
+
+    def test_schedule_has_absolute_boundaries(self):
+        schedule = build_schedule(PomodoroSchemas.Settings(), UTC_START)
+        self.assertEqual(len(schedule.phases), 8)
+        self.assertEqual(schedule.phases[1].phase, Phase.short_rest)
+        self.assertEqual(schedule.phases[1].utc_start, UTC_START + timedelta(minutes=25))
+        self.assertEqual(schedule.utc_end, UTC_START + timedelta(minutes=130))
+
+    def test_users_with_same_settings_share_a_group(self):
+        short = PomodoroSchemas.Settings(work_duration=15)
+        groups = build_schedule_groups({1: PomodoroSchemas.Settings(), 2: short,
+                                        3: PomodoroSchemas.Settings()}, UTC_START)
+        self.assertEqual([group.user_ids for group in groups], [[1, 3], [2]])
+        self.assertEqual(groups[1].settings, short)
+
+
+class TestSettingsByUserIds(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        async with self.engine.begin() as connection:
+            for table in (User.__table__, Pomodoro.__table__):
+                await connection.run_sync(table.create)
+            await connection.execute(insert(User).values(
+                id=1, username='someone', email='some@email.com', hashed_password='hash'))
+            await connection.execute(insert(Pomodoro).values(
+                user_id=1, work_duration=50, short_rest_duration=10,
+                long_rest_duration=30, number_of_sessions=2))
+        self.session = async_sessionmaker(self.engine)()
+
+    async def asyncTearDown(self) -> None:
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def test_defaults_without_saved_settings(self):
+        settings = await PomodoroAsyncCRUDDB(self.session).get_pomodoro_settings_by_user_ids([1, 2])
+        self.assertEqual(settings, {
+            1: PomodoroSchemas.Settings(work_duration=50, short_rest_duration=10,
+                                        long_rest_duration=30, number_of_sessions=2),
+            2: PomodoroSchemas.Settings(),
+        })
+
+
+class TestScheduleEndpoints(TestCase):
+    def setUp(self) -> None:
+        self.app = create_app(is_warmup_enabled=False)
+        self.user = UserSchemas.Get(id=1, username='someone', email='some@email.com',
+                                    is_active=True)
+        self.app.dependency_overrides[get_current_user_if_active] = lambda: self.user
+        self.client = TestClient(self.app)
+
+    def test_schedule_of_explicit_settings(self):
+        response = self.client.post('/api/pomodoro/schedule', json={
+            'settings': {'work_duration': 50, 'number_of_sessions': 1},
+            'utc_start': '2026-10-18T10:00:00+02:00',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        phases = response.json()['phases']
+        self.assertEqual([phase['phase'] for phase in phases], ['work', 'long_rest'])
+        self.assertEqual(phases[0]['utc_start'], '2026-10-18T08:00:00')
+        self.assertEqual(phases[1]['utc_end'], '2026-10-18T09:05:00')
+
+    def test_batch_requires_superuser(self):
+        response = self.client.post('/api/pomodoro/schedule/batch', json={'user_ids': [1, 2]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,133 @@
+import random
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException, status
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from src.auth.schemas import UserSchemas
+from src.main import create_app
+from src.pomodoro.phases import Phase, PhaseSpan, build_phase_sequence
+from src.pomodoro.schemas import PomodoroSchemas, TimerSchemas
+from src.pomodoro.timer import TimerService, get_timer_service
+from src.pomodoro.wheel import TimingWheel
+
+
+class TestTimingWheel(TestCase):
+    def test_timers_fire_on_their_tick(self):
+        wheel = TimingWheel()
+        random.seed(7)
+        delays = [1, 63, 64, 65, 4095, 4096, 4097, 20_000]
+        delays += [random.randint(1, 20_000) for _ in range(50_000)]
+        fired = []
+        for delay in delays:
+            wheel.call_later(delay, lambda delay=delay: fired.append((delay, wheel.tick)))
+        wheel.advance(20_000)
+        self.assertEqual(len(fired), len(delays))
+        self.assertTrue(all(delay == tick for delay, tick in fired))
+
+    def test_timers_beyond_top_level_fire(self):
+        wheel = TimingWheel(slot_bits=2, levels=2)
+        fired = []
+        wheel.advance(5)
+        wheel.call_later(40, lambda: fired.append(wheel.tick))
+        wheel.advance(40)
+        self.assertEqual(fired, [45])
+
+    def test_cancelled_timer_does_not_fire(self):
+        wheel = TimingWheel(tick_in_seconds=0.5)
+        fired = []
+        timer = wheel.call_later(100, lambda: fired.append(wheel.tick))
+        wheel.advance(150)
+        self.assertEqual(wheel.get_remaining_seconds(timer), 25)
+        timer.cancel()
+        wheel.advance(100)
+        self.assertEqual(fired, [])
+
+
+class TestPhaseSequence(TestCase):
+    def test_work_sessions_end_with_long_rest(self):
+        self.assertEqual(build_phase_sequence(25, 5, 15, 2), (
+            PhaseSpan(Phase.work, 1, 1500),
+            PhaseSpan(Phase.short_rest, 1, 300),
+            PhaseSpan(Phase.work, 2, 1500),
+            PhaseSpan(Phase.long_rest, 2, 900),
+        ))
+
+
+class TestTimerSession(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.wheel = TimingWheel()
+        self.record_history = AsyncMock()
+        self.service = TimerService(self.wheel, self.record_history)
+        self.on_change = AsyncMock()
+        settings = PomodoroSchemas.Settings(work_duration=1, short_rest_duration=1,
+                                            long_rest_duration=2, number_of_sessions=2)
+        self.session = self.service.create_session(1, settings, self.on_change)
+
+    async def test_phases_advance_and_work_is_recorded(self):
+        self.assertTrue(self.session.apply(TimerSchemas.Action.start))
+        self.wheel.advance(60)
+        await self.service.stop()
+        status_ = self.on_change.await_args.args[0]
+        self.assertEqual((status_.phase, status_.session, status_.remaining_in_seconds),
+                         (Phase.short_rest, 1, 60))
+        history = self.record_history.await_args.args[0]
+        self.assertEqual([(h.user_id, h.duration_in_seconds) for h in history], [(1, 60)])
+
+        self.wheel.advance(60 + 60 + 120)
+        await self.service.stop()
+        self.assertEqual(self.session.get_status().state, TimerSchemas.State.completed)
+        self.assertEqual(self.record_history.await_count, 2)
+
+    async def test_pause_keeps_remaining_time(self):
+        self.session.apply(TimerSchemas.Action.start)
+        self.wheel.advance(20)
+        self.assertTrue(self.session.apply(TimerSchemas.Action.pause))
+        self.assertFalse(self.session.apply(TimerSchemas.Action.pause))
+        self.wheel.advance(1000)
+        self.assertEqual(self.session.get_status().remaining_in_seconds, 40)
+        self.session.apply(TimerSchemas.Action.resume)
+        self.wheel.advance(39)
+        self.assertEqual(self.session.get_status().phase, Phase.work)
+        self.wheel.advance(1)
+        self.assertEqual(self.session.get_status().phase, Phase.short_rest)
+        await self.service.stop()
+
+
+class TestTimerEndpoint(TestCase):
+    def setUp(self) -> None:
+        get_timer_service.cache_clear()
+        self.client = TestClient(create_app(is_warmup_enabled=False))
+        user = UserSchemas.Get(id=1, username='someone', email='some@email.com', is_active=True)
+        settings = PomodoroSchemas.ReadCreate(id=1, user_id=1)
+        self.patches = [
+            patch('src.pomodoro.router.get_current_user', AsyncMock(return_value=user)),
+            patch('src.pomodoro.router.get_cached_settings', AsyncMock(return_value=settings)),
+        ]
+        for patcher in self.patches:
+            patcher.start()
+
+    def tearDown(self) -> None:
+        for patcher in self.patches:
+            patcher.stop()
+        get_timer_service.cache_clear()
+
+    def test_start_and_pause(self):
+        with self.client.websocket_connect('/api/pomodoro/timer?token=token') as websocket:
+            websocket.send_json({'action': 'start'})
+            started = websocket.receive_json()
+            self.assertEqual((started['state'], started['phase'], started['session']),
+                             ('running', 'work', 1))
+            self.assertEqual(started['remaining_in_seconds'], 25 * 60)
+            websocket.send_json({'action': 'pause'})
+            self.assertEqual(websocket.receive_json()['state'], 'paused')
+            websocket.send_json({'action': 'jump'})
+            self.assertIn('detail', websocket.receive_json())
+
+    def test_invalid_token_is_rejected(self):
+        with patch('src.pomodoro.router.get_current_user',
+                   AsyncMock(side_effect=HTTPException(status.HTTP_401_UNAUTHORIZED))):
+            with self.assertRaises(WebSocketDisconnect) as context:
+                with self.client.websocket_connect('/api/pomodoro/timer?token=bad'):
+                    pass
+        self.assertEqual(context.exception.code, status.WS_1008_POLICY_VIOLATION)
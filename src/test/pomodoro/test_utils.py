@@ -1,9 +1,15 @@
-from unittest import TestCase
-from src.pomodoro.utils import PomodoroCRUDDB
-from src.pomodoro.schemas import PomodoroSchemas, HistorySchemas
-from src.pomodoro.models import Pomodoro, PomodoroHistory
+from datetime import datetime
+from unittest import TestCase, IsolatedAsyncioTestCase
+from src.pomodoro.utils import (
+    PomodoroCRUDDB,
+    HistoryStatisticsAsyncDB,
+    encode_history_cursor,
+    decode_history_cursor,
+)
+from src.pomodoro.schemas import PomodoroSchemas, HistorySchemas, StatisticsSchemas
+from src.pomodoro.models import Pomodoro, PomodoroHistory, HistoryDailyRollup
 from src.pomodoro import constants
-from src.database import SessionLocal
+from src.database import SessionLocal, AsyncSessionLocal
 from src.auth.models import User
 from fastapi import HTTPException, status
 
@@ -30,6 +36,7 @@ class TestDBCRUD(TestCase):
             user_id=self.user1.id
         )
         self.session.add(self.pomodoro1)
+        self.session.flush()
         self.pomodoro1_history_record1 = PomodoroHistory(
             pomodoro_id=self.pomodoro1.id,
             duration_in_seconds=1000,
@@ -108,8 +115,40 @@ class TestDBCRUD(TestCase):
         self._compare_schemas(pomodoro_scheme, recived_pomodoro)
         
     def test_pomodoro_history_creation(self):
-        history_scheme = HistorySchemas.Create(user_id=self.user1, duration_in_seconds=900)
-        self.crud.create_pomodoro_history()
+        history_scheme = HistorySchemas.Create(user_id=self.user1.id, duration_in_seconds=900)
+        self.crud.create_pomodoro_history(history_scheme)
+
+        self.assertEqual(self._count_history_of(self.pomodoro1), 2)
+
+    def test_pomodoro_history_batch_creation(self):
+        intervals = [
+            HistorySchemas.Interval(duration_in_seconds=900),
+            HistorySchemas.Interval(
+                duration_in_seconds=1500, utc_end=datetime(2023, 3, 25, 17, 4)),
+        ]
+        created = self.crud.create_pomodoro_history_batch(self.user1.id, intervals)
+
+        self.assertEqual(created, len(intervals))
+        self.assertEqual(self._count_history_of(self.pomodoro1), 3)
+
+    def test_pomodoro_history_updates_daily_rollup(self):
+        day_end = datetime(2023, 3, 25, 17, 4)
+        intervals = [
+            HistorySchemas.Interval(duration_in_seconds=900, utc_end=day_end),
+            HistorySchemas.Interval(duration_in_seconds=1500, utc_end=day_end),
+        ]
+        self.crud.create_pomodoro_history_batch(self.user1.id, intervals)
+        self.crud.create_pomodoro_history(HistorySchemas.Create(
+            user_id=self.user1.id, duration_in_seconds=600, utc_end=day_end))
+
+        rollup = self.session.get(
+            HistoryDailyRollup, (self.pomodoro1.id, day_end.date()))
+        self.assertEqual(rollup.focus_seconds, 3000)
+        self.assertEqual(rollup.intervals, 3)
+
+    def _count_history_of(self, pomodoro: Pomodoro) -> int:
+        return self.session.query(PomodoroHistory).filter(
+            PomodoroHistory.pomodoro_id == pomodoro.id).count()
 
     def _check_recived_pomodoro_and_db_instance(
         self,
@@ -133,3 +172,37 @@ class TestDBCRUD(TestCase):
         for key, value in dict_second.items():
             if key in dict_first:
                 self.assertEqual(value, dict_first[key])
+
+
+class TestHistoryStatistics(IsolatedAsyncioTestCase):
+    async def test_reversed_range(self):
+        async with AsyncSessionLocal() as session:
+            statistics = HistoryStatisticsAsyncDB(session)
+            with self.assertRaises(HTTPException) as context:
+                await statistics.get_focus_statistics(
+                    1, StatisticsSchemas.Period.day,
+                    datetime(2023, 3, 25), datetime(2023, 3, 20))
+        self.assertEqual(context.exception.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_too_long_range(self):
+        async with AsyncSessionLocal() as session:
+            statistics = HistoryStatisticsAsyncDB(session)
+            with self.assertRaises(HTTPException) as context:
+                await statistics.get_focus_statistics(
+                    1, StatisticsSchemas.Period.month,
+                    datetime(2020, 1, 1), datetime(2023, 1, 1))
+        self.assertEqual(context.exception.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestHistoryCursor(TestCase):
+    def test_cursor_roundtrip(self):
+        utc_end = datetime(2023, 3, 25, 17, 4, 6, 906439)
+        cursor = encode_history_cursor(utc_end, 42)
+        self.assertEqual(decode_history_cursor(cursor), (utc_end, 42))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not base64!', encode_history_cursor(datetime(2023, 3, 25), 1)[:-4]):
+            with self.assertRaises(HTTPException) as context:
+                decode_history_cursor(cursor)
+            self.assertEqual(context.exception.status_code, status.HTTP_400_BAD_REQUEST)
+
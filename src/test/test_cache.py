@@ -0,0 +1,39 @@
+from unittest import TestCase
+from unittest.mock import patch
+from src.cache import TTLCache
+
+
+class TestTTLCache(TestCase):
+    def setUp(self) -> None:
+        self.cache = TTLCache(maxsize=2, ttl_in_seconds=10)
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get('user'))
+        self.cache.set('user', 1)
+        self.assertEqual(self.cache.get('user'), 1)
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set('first', 1)
+        self.cache.set('second', 2)
+        self.cache.get('first')
+        self.cache.set('third', 3)
+        self.assertIsNone(self.cache.get('second'))
+        self.assertEqual(self.cache.get('first'), 1)
+        self.assertEqual(self.cache.get('third'), 3)
+
+    def test_entry_expires(self):
+        with patch('src.cache.monotonic', return_value=100):
+            self.cache.set('user', 1)
+        with patch('src.cache.monotonic', return_value=111):
+            self.assertIsNone(self.cache.get('user'))
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_invalidate(self):
+        self.cache.set('user', 1)
+        self.cache.invalidate('user')
+        self.cache.invalidate('unknown')
+        self.assertIsNone(self.cache.get('user'))
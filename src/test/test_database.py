@@ -0,0 +1,38 @@
+import sqlite3
+from unittest import TestCase
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from src.database import InstrumentedQueuePool
+
+
+class TestInstrumentedQueuePool(TestCase):
+    def setUp(self) -> None:
+        self.pool = InstrumentedQueuePool(
+            lambda: sqlite3.connect(':memory:', check_same_thread=False),
+            pool_size=1, max_overflow=0, timeout=0.05)
+
+    def tearDown(self) -> None:
+        self.pool.dispose()
+
+    def test_checkout_is_counted(self):
+        connection = self.pool.connect()
+        statistics = self.pool.get_statistics()
+        connection.close()
+
+        self.assertEqual(statistics['checked_out'], 1)
+        self.assertEqual(statistics['checkouts'], 1)
+        self.assertEqual(self.pool.get_statistics()['checked_out'], 0)
+
+    def test_checkout_timeout_is_counted(self):
+        connection = self.pool.connect()
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.connect()
+        connection.close()
+
+        statistics = self.pool.get_statistics()
+        self.assertEqual(statistics['checkout_timeouts'], 1)
+        self.assertGreaterEqual(statistics['wait_time_max'], 0.05)
+
+    def test_statistics_survive_recreate(self):
+        self.pool.connect().close()
+        recreated_pool = self.pool.recreate()
+        self.assertEqual(recreated_pool.get_statistics()['checkouts'], 1)
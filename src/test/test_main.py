@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+IMPORT_TIME_BUDGET_IN_SECONDS = 2.0
+REPOSITORY_ROOT = Path(__file__).resolve().parents[2]
+IMPORT_SCRIPT = '''
+import json
+from time import perf_counter
+started_at = perf_counter()
+import src.main
+import_time = perf_counter() - started_at
+src.main.create_app()
+from src.database import get_settings, get_engine, get_async_engine
+from src.auth.constants import get_security_env
+from src.auth.utils import get_secret_manager, get_principal_cache
+from src.pomodoro.buffer import get_history_buffer
+getters = (get_settings, get_engine, get_async_engine, get_security_env,
+           get_secret_manager, get_principal_cache, get_history_buffer)
+print(json.dumps({
+    'import_time': import_time,
+    'built': [getter.__name__ for getter in getters if getter.cache_info().currsize],
+}))
+'''
+
+
+class TestColdStart(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # no settings in the environment and no .env file in the working directory
+        with TemporaryDirectory() as directory:
+            completed = subprocess.run(
+                [sys.executable, '-c', IMPORT_SCRIPT],
+                cwd=directory,
+                env={'PYTHONPATH': str(REPOSITORY_ROOT)},
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+        assert completed.returncode == 0, completed.stderr
+        cls.result = json.loads(completed.stdout)
+
+    def test_app_is_created_without_settings(self):
+        self.assertEqual(self.result['built'], [])
+
+    def test_import_time_budget(self):
+        self.assertLess(self.result['import_time'], IMPORT_TIME_BUDGET_IN_SECONDS)
@@ -0,0 +1,26 @@
+from datetime import datetime
+from unittest import TestCase
+import orjson
+from src.responses import ModelResponse
+from src.pomodoro.schemas import HistorySchemas
+
+
+class TestModelResponse(TestCase):
+    def test_nested_models_match_pydantic_json(self):
+        page = HistorySchemas.Page(
+            items=[HistorySchemas.Read(
+                id=1, utc_end=datetime(2026, 1, 1, 12, 30, 5, 123), duration_in_seconds=1500)],
+            next_cursor=None)
+        response = ModelResponse(page)
+        self.assertEqual(orjson.loads(response.body), orjson.loads(page.json()))
+
+    def test_list_of_models(self):
+        items = [HistorySchemas.Read(id=id_, utc_end=datetime(2026, 1, 1),
+                                     duration_in_seconds=60) for id_ in range(3)]
+        response = ModelResponse(items, status_code=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['id'] for item in orjson.loads(response.body)], [0, 1, 2])
+
+    def test_unknown_type_is_rejected(self):
+        with self.assertRaises(TypeError):
+            ModelResponse({'value': object()})
@@ -0,0 +1,56 @@
+import os
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+from src import database
+from src.database import dispose_engines
+from src.server import ServerEnv, get_hashing_workers_per_worker, get_uvicorn_options, main, parse_server_env
+
+
+class TestServerSettings(TestCase):
+    def test_legacy_test_port_is_an_integer(self):
+        with patch.dict(os.environ, {'TEST_HOST': '0.0.0.0', 'TEST_PORT': '9000'}):
+            server_env = ServerEnv(_env_file=None)
+        self.assertEqual((server_env.HOST, server_env.PORT), ('0.0.0.0', 9000))
+
+    def test_blank_workers_default_to_cpu_count(self):
+        with patch.dict(os.environ, {'SERVER_WORKERS': ''}), \
+                patch('src.server.os.cpu_count', return_value=8):
+            server_env = parse_server_env([])
+            self.assertIsNone(server_env.WORKERS)
+            self.assertEqual(get_uvicorn_options(server_env)['workers'], 8)
+
+    def test_arguments_override_environment(self):
+        with patch.dict(os.environ, {'SERVER_WORKERS': '2', 'SERVER_LOOP': 'asyncio'}):
+            server_env = parse_server_env(['--workers', '4', '--port', '8080'])
+        self.assertEqual(server_env.WORKERS, 4)
+        self.assertEqual(server_env.PORT, 8080)
+        self.assertEqual(server_env.LOOP, 'asyncio')
+
+    def test_workers_default_to_cpu_count(self):
+        with patch('src.server.os.cpu_count', return_value=8):
+            options = get_uvicorn_options(ServerEnv(_env_file=None))
+            self.assertEqual(options['workers'], 8)
+            self.assertEqual(get_hashing_workers_per_worker(3), 2)
+            self.assertEqual(get_hashing_workers_per_worker(16), 1)
+        self.assertTrue(options['factory'])
+
+    def test_hashing_workers_are_split_between_workers(self):
+        with patch.dict(os.environ, {'HASHING_WORKERS': ''}), \
+                patch('src.server.get_security_env') as get_security_env, \
+                patch('src.server.os.cpu_count', return_value=8), \
+                patch('src.server.uvicorn.run') as run:
+            del os.environ['HASHING_WORKERS']
+            get_security_env.return_value.HASHING_WORKERS = None
+            main(['--workers', '4'])
+            self.assertEqual(os.environ['HASHING_WORKERS'], '2')
+        run.assert_called_once()
+        self.assertEqual(run.call_args.kwargs['workers'], 4)
+
+
+class TestDisposeEngines(IsolatedAsyncioTestCase):
+    async def test_only_built_engines_are_disposed(self):
+        database.get_engine.cache_clear()
+        database.get_async_engine.cache_clear()
+        with patch.object(database, 'get_engine', wraps=database.get_engine) as get_engine:
+            await dispose_engines()
+        get_engine.assert_not_called()